@@ -0,0 +1,251 @@
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame as pg
+
+# Packed assets: one file holding a sprite atlas (every scaled/rotated animation frame plus the full-size
+# images), the game's sound effects as raw mixer PCM and the font bytes. The game maps it at startup and
+# serves whatever is in it without decoding; anything missing or whose source file has different contents
+# is decoded from the loose file instead (with a note on stderr), on a small thread pool when it can be asked
+# for ahead of time.
+#
+#   python assets.py          # rebuild assets.bundle after changing anything in images/, sounds/ or fonts/
+
+HEADER = struct.Struct('<4sBI')  # magic, version, index length
+
+
+class Assets:
+    BUNDLE = 'assets.bundle'
+    MAGIC, VERSION = b'PMAB', 2
+    WORKERS = 4
+    ATLAS_WIDTH = 1024
+
+    def __init__(self):
+        self.path = Assets.BUNDLE
+        self.index = None  # parsed bundle index, None when running from loose files
+        self.data = None  # the mapped bundle
+        self.atlas = None
+        self.pool = None
+        self.pending = {}  # path -> Future decoding a loose file
+        self.fonts = {}  # (path, size) -> Font
+        self.loaded = {'images': {}, 'sounds': {}, 'fonts': set()}  # loose files served, for build()
+        self.checked = {}  # path -> whether its bundled copy is still good
+        self.warned = False
+
+    def open(self):
+        # map the bundle once; a missing or foreign file just means loose files are used
+        path = self.path
+        if self.index is not None or path is None or not os.path.exists(path):
+            return self.index is not None
+        data = None
+        try:
+            with open(path, 'rb') as f:
+                # copy-on-write so pygame may wrap the atlas pixels without copying them
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            magic, version, size = HEADER.unpack_from(data)
+            if magic != Assets.MAGIC or version != Assets.VERSION:
+                data.close()
+                print(f'{path} was built by another version of the game; loading loose files '
+                      f'(run python assets.py to rebuild it)', file=sys.stderr)
+                return False
+            index = json.loads(data[HEADER.size:HEADER.size + size])
+            w, h, offset = index['atlas']
+            # every blob has to lie inside the file, or the bundle was cut short while being written or copied
+            end = max([offset + w * h * 4] + [start + length for section in ('sounds', 'fonts')
+                                              for start, length in index[section].values()])
+            if end > len(data):
+                raise ValueError(f'{len(data)} bytes, {end} expected')
+            atlas = pg.image.frombuffer(memoryview(data)[offset:offset + w * h * 4], (w, h), 'RGBA')
+        except (OSError, ValueError, struct.error, KeyError, TypeError) as error:
+            # empty (mmap refuses it), truncated or garbled
+            if data is not None:
+                data.close()
+            print(f'{path} is damaged ({error}); loading loose files (run python assets.py to rebuild it)',
+                  file=sys.stderr)
+            return False
+        self.index, self.data, self.atlas = index, data, atlas
+        return True
+
+    def fresh(self, path):
+        # only trust a bundled copy while its source file is unchanged
+        if self.index is None or path not in self.index['sources']:
+            return False
+        verdict = self.checked.get(path)
+        if verdict is None:
+            verdict = self.checked[path] = self.unchanged(path)
+            if not verdict and not self.warned:
+                self.warned = True
+                print(f'{self.path} is out of date ({path} changed); loading changed files from disk '
+                      f'(run python assets.py to rebuild it)', file=sys.stderr)
+        return verdict
+
+    def unchanged(self, path):
+        # same size and mtime, or else the same content: a clone or checkout gives every file a new mtime
+        size, mtime, sha1 = self.index['sources'][path]
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True  # bundled but no loose copy shipped
+        if st.st_size != size:
+            return False
+        return st.st_mtime_ns == mtime or digest(path) == sha1
+
+    def frames(self):
+        # (path, angle, scale) -> pre-transformed frame, for FrameCache
+        if self.index is None:
+            return {}
+        return {(path, angle, scale): self.atlas.subsurface(rect)
+                for path, angle, scale, *rect in self.index['frames'] if self.fresh(path)}
+
+    def prefetch(self, paths):
+        # start decoding loose images now so they are ready by the time they are asked for
+        for path in paths:
+            if path in self.pending:
+                continue
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=Assets.WORKERS)
+            self.pending[path] = self.pool.submit(pg.image.load, path)
+
+    def source(self, path):
+        # a loose image decoded for transforming (FrameCache), never bundled at full size
+        future = self.pending.pop(path, None)
+        return future.result() if future is not None else pg.image.load(path)
+
+    def image(self, path):
+        if self.index is not None and path in self.index['images'] and self.fresh(path):
+            return self.atlas.subsurface(self.index['images'][path])
+        image = self.loaded['images'][path] = self.source(path)
+        return image
+
+    def sound(self, path):
+        entry = self.index and self.index['sounds'].get(path)
+        if entry and self.fresh(path) and list(pg.mixer.get_init() or ()) == self.index['mixer']:
+            offset, size = entry
+            return pg.mixer.Sound(buffer=memoryview(self.data)[offset:offset + size])
+        sound = pg.mixer.Sound(path)
+        self.loaded['sounds'][path] = sound
+        return sound
+
+    def font(self, path, size):
+        # one Font per (file, size) however many buttons ask for it
+        key = (path, size)
+        font = self.fonts.get(key)
+        if font is None:
+            entry = self.index and self.index['fonts'].get(path)
+            if entry and self.fresh(path):
+                offset, length = entry
+                font = pg.font.Font(io.BytesIO(self.data[offset:offset + length]), size)
+            else:
+                font = pg.font.Font(path, size)
+                self.loaded['fonts'].add(path)
+            self.fonts[key] = font
+        return font
+
+
+assets = Assets()
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def pack(sizes, width):
+    # shelf packing, tallest first: returns a position per size and the atlas height
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = [None] * len(sizes)
+    x = y = shelf = 0
+    for i in order:
+        w, h = sizes[i]
+        if x + w > width:
+            x, y, shelf = 0, y + shelf, 0
+        positions[i] = (x, y)
+        x += w
+        shelf = max(shelf, h)
+    return positions, y + shelf
+
+
+def build(path=Assets.BUNDLE):
+    # start a game from loose files and pack everything it loaded
+    from pacman_game import Game, frames
+    assets.path = None  # load everything from the loose files
+    frames.clear()
+    Game(title='Pac-Man asset build', headless=True)
+
+    entries = [('frame', key, surface) for key, surface in frames.frames.items()]
+    entries += [('image', name, surface) for name, surface in assets.loaded['images'].items()]
+    sizes = [surface.get_size() for _, _, surface in entries]
+    width = max(Assets.ATLAS_WIDTH, 2 * max(w for w, _ in sizes))  # two full-screen images side by side
+    positions, height = pack(sizes, width)
+    atlas = pg.Surface((width, height), pg.SRCALPHA, 32)
+    index = {'frames': [], 'images': {}, 'sounds': {}, 'fonts': {}, 'sources': {},
+             'mixer': list(pg.mixer.get_init() or ())}
+    for (kind, key, surface), (x, y), (w, h) in zip(entries, positions, sizes):
+        # MAX onto the transparent atlas copies pixels and alpha exactly instead of blending them
+        atlas.blit(surface.convert_alpha(), (x, y), special_flags=pg.BLEND_RGBA_MAX)
+        if kind == 'frame':
+            index['frames'].append([*key, x, y, w, h])
+        else:
+            index['images'][key] = [x, y, w, h]
+
+    blobs = [pg.image.tostring(atlas, 'RGBA')]
+    blobNames = [('atlas', None)]
+    for name, sound in assets.loaded['sounds'].items():
+        blobs.append(sound.get_raw())
+        blobNames.append(('sounds', name))
+    for name in sorted(assets.loaded['fonts']):
+        with open(name, 'rb') as f:
+            blobs.append(f.read())
+        blobNames.append(('fonts', name))
+    sources = {key[0] for key in frames.frames} | set(assets.loaded['images']) | \
+        set(assets.loaded['sounds']) | assets.loaded['fonts']
+    for name in sorted(sources):
+        st = os.stat(name)
+        index['sources'][name] = [st.st_size, st.st_mtime_ns, digest(name)]
+
+    # blob offsets depend on the index length, so lay out the index with placeholder offsets first
+    def layout():
+        blob = json.dumps(index, separators=(',', ':')).encode()
+        offset = HEADER.size + len(blob)
+        for (section, name), data in zip(blobNames, blobs):
+            offset = (offset + 15) & ~15
+            if section == 'atlas':
+                index['atlas'] = [width, height, offset]
+            else:
+                index[section][name] = [offset, len(data)]
+            offset += len(data)
+        return blob
+
+    index['atlas'] = [width, height, 0]
+    for section, name in blobNames[1:]:
+        index[section][name] = [0, 0]
+    while True:
+        blob = layout()
+        if json.dumps(index, separators=(',', ':')).encode() == blob:
+            break
+
+    with open(path + '.tmp', 'wb') as f:
+        f.write(HEADER.pack(Assets.MAGIC, Assets.VERSION, len(blob)) + blob)
+        for data in blobs:
+            f.write(bytes(-f.tell() % 16))
+            f.write(data)
+    os.replace(path + '.tmp', path)
+    return index
+
+
+if __name__ == '__main__':
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    # import ourselves so build() fills the same Assets instance the game imports
+    from assets import build
+    index = build()
+    print(f"{Assets.BUNDLE}: {len(index['frames'])} frames, {len(index['images'])} images, "
+          f"{len(index['sounds'])} sounds, {len(index['fonts'])} fonts, {os.path.getsize(Assets.BUNDLE)} bytes")
+    sys.exit(0)
@@ -0,0 +1,460 @@
+import argparse
+import os
+import random
+import sys
+
+import numpy as np
+
+from pacman_game import KEYS, Enemy, Game, Player, Portal
+
+
+class BatchSim:
+    # N independent games held as NumPy arrays and stepped together. The maze (walls, pellet layout,
+    # ghost graph) is read from a Game, usually Game(title, headless=True), so there is one source of truth.
+    #
+    # Rules follow Player/Enemy/Portal/Grid. Differences: Pac-Man's death animation is skipped, so a
+    # caught Pac-Man respawns on the same step, and a game is done (not sent to the menu) at zero lives.
+    SIZE = 25  # actors are all 25x25 rects
+    XMIN, XMAX, YMIN, YMAX = -64, 640, 0, 720  # extent of the position lookup maps
+    NOOP, LEFT, RIGHT, UP, DOWN, BLUE, ORANGE = range(7)
+    MOVES = np.array([(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)], dtype=np.int32)
+    # facing: 0 right, 1 left, 2 down, 3 up (Player.currentAngle 0 / 180 / -90 / 90)
+    PORTAL_OFFSETS = np.array([(10, -10), (-35, -10), (-10, 10), (-10, -35)], dtype=np.int32)
+    PORTAL_DIRS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.int32)
+    PORTAL_PARKED = np.array([(350, 660), (400, 660)], dtype=np.int32)
+
+    _distances = {}  # walkable-lattice bytes -> all-pairs node distance table, shared across instances
+    _nearest = {}  # walkable-lattice bytes and bounds -> nearest-node map, shared across instances
+
+    def __init__(self, game, n, playerSpeed=Player.SPEED, ghostSpeed=Enemy.SPEED, portalSpeed=Portal.SPEED):
+        self.n = n
+        self.playerSpeed, self.baseGhostSpeed, self.portalSpeed = playerSpeed, ghostSpeed, portalSpeed
+        self.width, self.height = game.WINDOW_WIDTH, game.WINDOW_HEIGHT
+
+        # top-left positions at which a 25x25 rect overlaps a wall, as one boolean lookup per position
+        self.wallMap = self.blocked_map(game.walls)
+        self.ghostMap = self.blocked_map(game.gWalls)
+        # free pixels ahead of every position in each PORTAL_DIRS direction, for WallIndex.cast-style landings
+        self.runMaps = self.run_maps(self.wallMap)
+
+        spawns = game.maze.spawns
+        self.PLAYER_START = spawns['player']
+        self.GHOST_STARTS = tuple(spawns[name] for name in game.GHOST_NAMES)  # blinky, pinky, inky, clyde
+
+        grid = game.grid
+        self.lattice = grid.lattice
+        self.layout = np.frombuffer(bytes(grid.layout), dtype=np.uint8).astype(bool)
+        self.pelletSize = grid.size
+        # most lattice rows (and columns) an actor can overlap at once, as Lattice.tile_span counts them
+        self.span = -(-(self.SIZE + self.pelletSize - 1) // self.lattice.pitch)
+        self.powerRects = np.array([tuple(r) for r in grid.powerRects], dtype=np.int32)
+
+        self.compile_nav(game.navGrid, game.ghostAI)
+
+        self.player = np.zeros((n, 2), np.int32)
+        self.playerVel = np.zeros((n, 2), np.int32)
+        self.facing = np.zeros(n, np.int32)
+        self.ghosts = np.zeros((n, 4, 2), np.int32)
+        self.ghostTarget = np.full((n, 4), -1, np.int32)  # dense nav node each ghost is walking to
+        self.ghostHeading = np.full((n, 4), -1, np.int32)  # index into GhostAI.DIRECTIONS
+        self.ghostSpeed = np.zeros(n, np.int32)
+        self.portals = np.zeros((n, 2, 2), np.int32)
+        self.portalDir = np.zeros((n, 2), np.int32)  # index into PORTAL_DIRS
+        self.portalTravel = np.full((n, 2), -1, np.int32)  # pixels left to the landing point, -1 when not flying
+        self.portalActive = np.zeros((n, 2), bool)
+        self.pellets = np.zeros((n, len(self.layout)), bool)
+        self.power = np.zeros((n, len(self.powerRects)), bool)
+        self.remaining = np.zeros(n, np.int32)
+        self.pacNode = np.zeros(n, np.int32)
+        self.score = np.zeros(n, np.int64)
+        self.lives = np.zeros(n, np.int32)
+        self.level = np.zeros(n, np.int32)
+        self.bluemode = np.zeros(n, bool)
+        self.frame = np.zeros(n, np.int64)
+        self.done = np.zeros(n, bool)
+        self.reset()
+
+    # ---------------------------------------------------------------------------------
+    def blocked_map(self, walls):
+        blocked = np.zeros((self.YMAX - self.YMIN, self.XMAX - self.XMIN), bool)
+        for wall in walls:
+            x, y, w, h = tuple(getattr(wall, 'rect', wall))
+            x0, x1 = max(x - self.SIZE + 1, self.XMIN), min(x + w, self.XMAX)
+            y0, y1 = max(y - self.SIZE + 1, self.YMIN), min(y + h, self.YMAX)
+            if x0 < x1 and y0 < y1:
+                blocked[y0 - self.YMIN:y1 - self.YMIN, x0 - self.XMIN:x1 - self.XMIN] = True
+        return blocked
+
+    @staticmethod
+    def run_maps(blocked):
+        def ahead(b):
+            # 1px steps to the right before the next blocked position (0 where already blocked)
+            n = b.shape[1]
+            index = np.where(b, np.arange(n), 1 << 20)
+            first = np.minimum.accumulate(index[:, ::-1], axis=1)[:, ::-1]  # first blocked at or after x
+            after = np.concatenate([first[:, 1:], np.full((b.shape[0], 1), 1 << 20)], axis=1)
+            return np.where(b, 0, after - np.arange(n) - 1).astype(np.int32)
+
+        return np.stack([ahead(blocked), ahead(blocked[:, ::-1])[:, ::-1],
+                         ahead(blocked.T).T, ahead(blocked.T[:, ::-1])[:, ::-1].T])
+
+    def lookup(self, table, pos):
+        x = np.clip(pos[..., 0], self.XMIN, self.XMAX - 1) - self.XMIN
+        y = np.clip(pos[..., 1], self.YMIN, self.YMAX - 1) - self.YMIN
+        return table[y, x]
+
+    def compile_nav(self, nav, ai):
+        nodes = np.array(nav.nodes, dtype=np.int32)
+        dense = np.full(len(nav.walkable), -1, np.int32)
+        dense[nodes] = np.arange(len(nodes), dtype=np.int32)
+        self.nodePos = np.array([nav.position(i) for i in nav.nodes], dtype=np.int32)
+        self.links = np.array([[-1 if j is None else dense[j] for j in nav.links[i]] for i in nav.nodes],
+                              dtype=np.int32)
+        self.cell = nav.cell
+
+        key = bytes(nav.walkable)
+        table = BatchSim._distances.get(key)
+        if table is None:
+            table = np.empty((len(nodes), len(nodes)), np.int32)
+            for d, i in enumerate(nav.nodes):
+                table[d] = np.array(nav.flow_field(i), dtype=np.int32)[nodes]
+            table = BatchSim._distances[key] = table
+        self.distances = table
+        # GhostAI.homes is keyed in blinky, pinky, inky, clyde order
+        self.homeFields = np.array([np.array(field, dtype=np.int32)[nodes] for field in ai.homes.values()],
+                                   np.int32)
+        self.scatter, self.cycle = ai.SCATTER, ai.SCATTER + ai.CHASE
+
+        key = (bytes(nav.walkable), nav.left, nav.top, nav.cols, nav.cell)
+        nearest = BatchSim._nearest.get(key)
+        if nearest is None:
+            nearest = BatchSim._nearest[key] = self.nearest_map(nav, dense)
+        self.nearestMap = nearest
+
+    def nearest_map(self, nav, dense):
+        # NavGrid.nearest for every top-left position: the closest of the four surrounding lattice spots
+        ys, xs = np.mgrid[self.YMIN:self.YMAX, self.XMIN:self.XMAX]
+        col, row = (xs - nav.left) // nav.cell, (ys - nav.top) // nav.cell
+        best = np.full(xs.shape, -1, np.int32)
+        bestD = np.full(xs.shape, np.iinfo(np.int32).max, np.int64)
+        for dc, dr in ((0, 0), (1, 0), (0, 1), (1, 1)):
+            c, r = col + dc, row + dr
+            inside = (c >= 0) & (c < nav.cols) & (r >= 0) & (r < nav.rows)
+            lattice = np.where(inside, r * nav.cols + c, 0)
+            node = np.where(inside, dense[lattice], -1)
+            d = (nav.left + c * nav.cell - xs) ** 2 + (nav.top + r * nav.cell - ys) ** 2
+            better = (node >= 0) & (d < bestD)
+            best = np.where(better, node, best)
+            bestD = np.where(better, d, bestD)
+        # where none of them is walkable, the closest node anywhere (the first one on ties, as min() picks): the
+        # closest in each lattice row, then the closest of those, going through the rows in order
+        missing = best < 0
+        x, y = xs[missing], ys[missing]
+        found = np.full(x.shape, -1, np.int32)
+        foundD = np.full(x.shape, np.iinfo(np.int64).max, np.int64)
+        rows = self.nodePos[:, 1]
+        for ny in np.unique(rows):
+            inRow = np.flatnonzero(rows == ny)
+            dx = (self.nodePos[inRow, 0][:, None] - np.arange(self.XMIN, self.XMAX)) ** 2
+            closest = np.argmin(dx, axis=0)
+            d = dx[closest, np.arange(dx.shape[1])][x - self.XMIN] + (ny - y).astype(np.int64) ** 2
+            better = d < foundD
+            found[better], foundD[better] = inRow[closest[x - self.XMIN]][better], d[better]
+        best[missing] = found
+        return best
+
+    # ---------------------------------------------------------------------------------
+    def reset(self, mask=None):
+        m = np.ones(self.n, bool) if mask is None else np.asarray(mask, bool)
+        self.player[m] = self.PLAYER_START
+        self.playerVel[m] = 0
+        self.facing[m] = 0
+        self.ghosts[m] = self.GHOST_STARTS
+        self.ghostTarget[m] = -1
+        self.ghostHeading[m] = -1
+        self.ghostSpeed[m] = self.baseGhostSpeed
+        self.portals[m] = self.PORTAL_PARKED[0]
+        self.portalTravel[m] = -1
+        self.portalActive[m] = False
+        # a new Game starts with an empty board; its first frame levels up to 1 and fills it
+        self.pellets[m] = False
+        self.power[m] = False
+        self.remaining[m] = 0
+        self.pacNode[m] = self.lookup(self.nearestMap, self.player[m])
+        self.score[m] = 0
+        self.lives[m] = 3
+        self.level[m] = 0
+        self.bluemode[m] = False
+        self.frame[m] = 0
+        self.done[m] = False
+
+    def respawn(self, m):
+        self.player[m] = self.PLAYER_START
+        self.playerVel[m] = 0
+        self.ghosts[m] = self.GHOST_STARTS
+
+    # ---------------------------------------------------------------------------------
+    def step(self, actions):
+        # actions: one of NOOP, LEFT, RIGHT, UP, DOWN, BLUE, ORANGE per game; finished games are frozen
+        actions = np.asarray(actions)
+        live = ~self.done
+
+        # Game.process_event_loop
+        moving = live & (actions >= self.LEFT) & (actions <= self.DOWN)
+        self.playerVel[moving] = self.playerSpeed * self.MOVES[actions[moving]]
+        for p, action in enumerate((self.BLUE, self.ORANGE)):
+            fire = live & (actions == action)
+            facing = self.facing[fire]
+            start = self.player[fire] + self.SIZE // 2 + self.PORTAL_OFFSETS[facing]
+            self.portals[fire, p] = start
+            self.portalDir[fire, p] = facing
+            self.portalTravel[fire, p] = self.portal_landing(start, facing)
+            self.portalActive[fire, p] = False
+
+        self.grid_update(live)
+        self.player_update(live)
+        for p in range(2):
+            self.portal_update(live, p)
+        self.ghost_update(live)
+        self.frame[live] += 1
+
+    def grid_update(self, live):
+        # Grid.check_hit: pellets under Pac-Man, power pellets, then level up on an empty board
+        left, top = self.player[:, 0], self.player[:, 1]
+        lattice, size = self.lattice, self.pelletSize
+        pitch = lattice.pitch
+        col0 = np.maximum(0, (left - lattice.left - size) // pitch + 1)
+        col1 = np.minimum(lattice.cols - 1, (left + self.SIZE - 1 - lattice.left) // pitch)
+        row0 = np.maximum(0, (top - lattice.top - size) // pitch + 1)
+        row1 = np.minimum(lattice.rows - 1, (top + self.SIZE - 1 - lattice.top) // pitch)
+        offsets, window = np.arange(self.span), self.span * self.span
+        cols = col0[:, None] + offsets
+        rows = row0[:, None] + offsets
+        valid = ((cols <= col1[:, None])[:, None, :] & (rows <= row1[:, None])[:, :, None]
+                 & live[:, None, None])
+        tiles = rows[:, :, None] * lattice.cols + np.minimum(cols, lattice.cols - 1)[:, None, :]
+        tiles = tiles.reshape(self.n, window)
+        valid = valid.reshape(self.n, window) & (tiles < self.pellets.shape[1])
+        tiles = np.where(valid, tiles, 0)
+        games = np.broadcast_to(np.arange(self.n)[:, None], tiles.shape)
+        eaten = self.pellets[games, tiles] & valid
+        self.pellets[games[eaten], tiles[eaten]] = False
+        count = eaten.sum(axis=1)
+        self.remaining -= count.astype(np.int32)
+        self.score[count > 0] += 10
+
+        px, py, pw, ph = (self.powerRects[:, k] for k in range(4))
+        hit = (self.power & live[:, None]
+               & (left[:, None] < px + pw) & (left[:, None] + self.SIZE > px)
+               & (top[:, None] < py + ph) & (top[:, None] + self.SIZE > py))
+        self.power &= ~hit
+        powered = hit.any(axis=1)
+        self.bluemode |= powered
+        self.score[powered] += 50
+
+        cleared = live & (self.remaining == 0)
+        self.level[cleared] += 1
+        self.ghostSpeed[cleared] += 1
+        self.pellets[cleared] = self.layout
+        self.power[cleared] = True
+        self.remaining[cleared] = int(self.layout.sum())
+
+    def teleport(self, pos, mask):
+        # a rect touching an open portal comes out of the other one, and both portals close
+        both = mask & self.portalActive.all(axis=1)
+        for p in range(2):
+            other = self.portals[:, 1 - p].copy()
+            touch = both & self.overlap(pos, self.portals[:, p])
+            pos[touch] = other[touch]
+            self.portals[touch] = self.PORTAL_PARKED
+            self.portalActive[touch] = False
+            self.portalTravel[touch] = -1
+            both &= ~touch
+
+    @staticmethod
+    def overlap(a, b):
+        return (np.abs(a[..., 0] - b[..., 0]) < BatchSim.SIZE) & (np.abs(a[..., 1] - b[..., 1]) < BatchSim.SIZE)
+
+    def player_update(self, live):
+        # Player.check_ghosts (with an instant respawn instead of the death animation)
+        touching = live[:, None] & self.overlap(self.player[:, None, :], self.ghosts)
+        caught = touching.any(axis=1)
+        dies = caught & ~self.bluemode
+        eats = caught & self.bluemode
+        self.score[eats] += 200
+        eatenGhosts = touching & eats[:, None]
+        self.ghosts[eatenGhosts] = np.broadcast_to(np.array(self.GHOST_STARTS, np.int32), self.ghosts.shape)[
+            eatenGhosts]
+        self.bluemode[eats] = False
+        self.lives[dies] -= 1
+        self.respawn(dies)
+        self.done |= dies & (self.lives <= 0)
+        live = live & ~self.done
+
+        # Player.check_collisions / Player.move
+        self.teleport(self.player, live)
+        moving = live & self.playerVel.any(axis=1)
+        free = moving & ~self.lookup(self.wallMap, self.player)
+        self.player[free] += self.playerVel[free]
+        self.teleport(self.player, moving)
+        hit = moving & self.lookup(self.wallMap, self.player)
+        self.player[hit] -= self.playerVel[hit]
+
+        vx, vy = self.playerVel[:, 0], self.playerVel[:, 1]
+        facing = np.where(vx > 0, 0, np.where(vx < 0, 1, np.where(vy > 0, 2, 3)))
+        self.facing[moving] = facing[moving]
+
+        # Player.limit_to_screen
+        left = self.player[:, 0]
+        top = np.clip(self.player[:, 1], 73, self.height - self.SIZE - 80)
+        left = np.where(left > self.height, np.clip(left, -28, self.width - self.SIZE + 48),
+                        np.where(left < -30, self.width, np.where(left > self.width, -30, left)))
+        self.player[moving, 0] = left[moving]
+        self.player[moving, 1] = top[moving]
+
+    def portal_landing(self, start, facing):
+        # Portal.create_portal: distance to the first wall or the edge of the playfield
+        x, y = start[:, 0], start[:, 1]
+        limits = np.stack([self.width - self.SIZE + 48 - x, x + 28, self.height - self.SIZE - 55 - y, y - 73], axis=1)
+        reach = np.maximum(0, limits[np.arange(len(start)), facing])
+        sx = np.clip(x, self.XMIN, self.XMAX - 1) - self.XMIN
+        sy = np.clip(y, self.YMIN, self.YMAX - 1) - self.YMIN
+        return np.minimum(reach, self.runMaps[facing, sy, sx])
+
+    def portal_update(self, live, p):
+        # Portal.move: fly toward the landing point found when the portal was fired, then open
+        pos, travel = self.portals[:, p], self.portalTravel[:, p]
+        flying = live & (travel >= 0)
+        step = np.where(flying, np.minimum(self.portalSpeed, travel) if self.portalSpeed > 0 else travel, 0)
+        pos += step[:, None] * self.PORTAL_DIRS[self.portalDir[:, p]]
+        travel -= step
+        landed = flying & (travel == 0)
+        self.portalActive[landed, p] = True
+        travel[landed] = -1
+        pos[live, 1] = np.clip(pos[live, 1], 73, self.height - self.SIZE - 55)
+        pos[live, 0] = np.clip(pos[live, 0], -28, self.width - self.SIZE + 48)
+
+    def ghost_update(self, live):
+        # GhostAI.steer for every ghost at once: walk ghostSpeed pixels along the nav lattice
+        self.pacNode = np.where(live, self.lookup(self.nearestMap, self.player), self.pacNode)
+        scatter = (self.frame % self.cycle) < self.scatter
+
+        pos = self.ghosts.copy()
+        target, heading = self.ghostTarget, self.ghostHeading
+        budget = np.where(live, self.ghostSpeed, 0)[:, None].repeat(4, axis=1)
+        for _ in range(int(self.ghostSpeed.max(initial=0)) // self.cell + 3):
+            active = budget > 0
+            if not active.any():
+                break
+            tpos = self.nodePos[np.maximum(target, 0)]
+            dx, dy = tpos[..., 0] - pos[..., 0], tpos[..., 1] - pos[..., 1]
+            lost = active & ((target < 0) | ((dx != 0) & (dy != 0)) | (np.abs(dx) + np.abs(dy) > self.cell))
+            snapped = self.lookup(self.nearestMap, pos)
+            target[lost] = snapped[lost]
+            active &= target >= 0
+            budget[~active] = 0
+            tpos = self.nodePos[np.maximum(target, 0)]
+            dx, dy = tpos[..., 0] - pos[..., 0], tpos[..., 1] - pos[..., 1]
+
+            arrived = active & (dx == 0) & (dy == 0)
+            if arrived.any():
+                nxt = self.links[np.maximum(target, 0)]  # (n, 4, 4 directions)
+                valid = nxt >= 0
+                safe = np.maximum(nxt, 0)
+                games = np.arange(self.n)[:, None, None]
+                ghosts = np.arange(4)[None, :, None]
+                home = self.homeFields[ghosts, safe]
+                field = np.where(scatter[:, None, None] & ~self.bluemode[:, None, None], home,
+                                 self.distances[self.pacNode[games], safe])
+                score = np.where(self.bluemode[:, None, None], -field, field).astype(np.int64)
+                reverse = (heading[..., None] >= 0) & (np.arange(4) == (heading[..., None] + 2) % 4)
+                forward = valid & ~reverse
+                score = np.where(forward, score, np.iinfo(np.int64).max)
+                choice = np.argmin(score, axis=2)
+                stuck = ~forward.any(axis=2)
+                back = np.where(heading >= 0, (heading + 2) % 4, 0)
+                choice = np.where(stuck, back, choice)
+                ok = np.take_along_axis(valid, choice[..., None], axis=2)[..., 0] & (~stuck | (heading >= 0))
+                newTarget = np.take_along_axis(nxt, choice[..., None], axis=2)[..., 0]
+                turn = arrived & ok
+                target[turn] = newTarget[turn]
+                heading[turn] = choice[turn]
+                budget[arrived & ~ok] = 0
+                active &= budget > 0
+                tpos = self.nodePos[np.maximum(target, 0)]
+                dx, dy = tpos[..., 0] - pos[..., 0], tpos[..., 1] - pos[..., 1]
+
+            step = np.minimum(budget, np.abs(dx)) * active
+            pos[..., 0] += np.sign(dx) * step
+            budget -= step
+            step = np.minimum(budget, np.abs(dy)) * active
+            pos[..., 1] += np.sign(dy) * step
+            budget -= step
+
+        velocity = pos - self.ghosts
+
+        # Enemy.check_collisions (portals carry ghosts from level 3) then Enemy.move
+        powered = live & (self.level >= 3)
+        for g in range(4):
+            ghost = self.ghosts[:, g]
+            self.teleport(ghost, powered)
+            v = velocity[:, g]
+            moving = live & v.any(axis=1)
+            free = moving & ~self.lookup(self.ghostMap, ghost)
+            ghost[free] += v[free]
+            hit = moving & self.lookup(self.ghostMap, ghost)
+            ghost[hit] -= v[hit]
+            ghost[moving, 1] = np.clip(ghost[moving, 1], 73, self.height - self.SIZE - 55)
+            ghost[moving, 0] = np.clip(ghost[moving, 0], -28, self.width - self.SIZE + 48)
+
+
+def parity(game, seed, frames=3000, every=12):
+    # Plays a headless Game and a one-game BatchSim side by side on the same seeded actions, a random one every
+    # few frames, and returns (first frame where they differ or None, portal jumps Pac-Man made). Actor
+    # positions, the score and Pac-Man's nav node are compared until the first death, whose animation
+    # BatchSim skips.
+    import pygame as pg
+    random.seed(seed)
+    game.reset()
+    sim = BatchSim(game, 1)
+    dense = {node: i for i, node in enumerate(game.navGrid.nodes)}
+    rng = random.Random(seed)
+    actors = (game.player, *game.ghosts, game.bluePortal, game.oranPortal)
+    jumps = 0
+    for frame in range(frames):
+        action = rng.randint(BatchSim.LEFT, BatchSim.ORANGE) if frame % every == 0 else BatchSim.NOOP
+        x, y = game.player.rect.topleft
+        game.step([pg.event.Event(pg.KEYDOWN, key=KEYS[action - 1])] if action else ())
+        sim.step(np.array([action]))
+        if game.player.death:
+            break
+        if abs(game.player.rect.left - x) + abs(game.player.rect.top - y) > Player.SPEED:
+            jumps += 1
+        state = [tuple(actor.rect.topleft) for actor in actors]
+        simState = [tuple(sim.player[0])] + [tuple(p) for p in sim.ghosts[0]] + [tuple(p) for p in sim.portals[0]]
+        if state != simState or game.score != sim.score[0] or dense[game.ghostAI.target] != sim.pacNode[0]:
+            return frame, jumps
+    return None, jumps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check BatchSim against Game frame for frame')
+    parser.add_argument('seeds', type=int, nargs='*', default=list(range(8)))
+    parser.add_argument('--frames', type=int, default=3000)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    game = Game(title='Pac-Man parity', headless=True)
+    failed = 0
+    for seed in args.seeds:
+        frame, jumps = parity(game, seed, args.frames)
+        print(f'seed {seed}: ' + ('same' if frame is None else f'differs at frame {frame}') +
+              f', {jumps} portal jumps')
+        failed += frame is not None
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame as pg
+
+from pacman_game import KEYS, SPEEDS, Enemy, Game, Player, Portal
+
+# Headless frame-time benchmarks for the game loop. Every run uses the SDL dummy drivers, a seeded RNG and
+# a scripted key sequence, and writes machine-readable JSON so two commits can be compared:
+#
+#   python benchmark.py --out before.json
+#   python benchmark.py --compare before.json
+
+def script(seed, frames, every=12):
+    # one scripted key press every few frames, same for every run with the same seed
+    rng = random.Random(seed)
+    return [[pg.event.Event(pg.KEYDOWN, key=rng.choice(KEYS))] if i % every == 0 else [] for i in range(frames)]
+
+
+def new_game(seed, render):
+    # level-ups bump the speed class attributes, so every measured game starts from the same values
+    Player.SPEED, Enemy.SPEED, Portal.SPEED = SPEEDS
+    random.seed(seed)
+    game = Game(title='Pac-Man benchmark', headless=True)
+    game.render = render
+    return game
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def summarize(samples):
+    if not samples:
+        return {'n': 0}
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {'n': len(ordered),
+            'mean_ms': 1000 * total / len(ordered),
+            'p50_ms': 1000 * percentile(ordered, 50),
+            'p90_ms': 1000 * percentile(ordered, 90),
+            'p99_ms': 1000 * percentile(ordered, 99),
+            'max_ms': 1000 * ordered[-1],
+            'per_sec': len(ordered) / total if total else None}
+
+
+class Timings:
+    # wraps bound methods on instances so each call is timed without touching the game code
+
+    def __init__(self):
+        self.samples = {}
+
+    def wrap(self, obj, method, name):
+        inner = getattr(obj, method)
+        samples = self.samples.setdefault(name, [])
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return inner(*args, **kwargs)
+            finally:
+                samples.append(clock() - start)
+
+        setattr(obj, method, timed)
+
+
+# times one Game construction in a fresh interpreter, so the frame cache and assets start cold every run
+STARTUP = ('import sys, time, benchmark; start = time.perf_counter(); benchmark.new_game(int(sys.argv[1]), False); '
+           'print(time.perf_counter() - start)')
+
+
+def bench_startup(runs, seed):
+    samples = []
+    for _ in range(runs):
+        child = subprocess.run([sys.executable, '-c', STARTUP, str(seed)], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+        samples.append(float(child.stdout.split()[-1]))
+    return summarize(samples)
+
+
+def bench_gameplay(frames, seed, render):
+    game = new_game(seed, render)
+    timings = Timings()
+    timings.wrap(game, 'update', 'game.update')
+    timings.wrap(game.grid, 'update', 'grid.update')
+    timings.wrap(game.player, 'update', 'player.update')
+    for ghost in (game.blinky, game.pinky, game.inky, game.clyde):
+        timings.wrap(ghost, 'update', 'enemy.update')
+    for portal in (game.bluePortal, game.oranPortal):
+        timings.wrap(portal, 'update', 'portal.update')
+
+    # a headless game ends at game over; frames after that would time a finished game
+    events = script(seed, frames)
+    played = level = 0
+    start = time.perf_counter()
+    for frame in events:
+        if game.finished:
+            break
+        game.step(frame)
+        played += 1
+        level = max(level, game.level)
+    elapsed = time.perf_counter() - start
+
+    results = {name: summarize(samples) for name, samples in timings.samples.items()}
+    results['game.update']['sim_frames_per_sec'] = played / elapsed
+    results['game.update']['frames_played'] = played
+    results['game.update']['final_score'] = game.lastScore if game.finished else game.score
+    results['game.update']['final_level'] = level
+    return results
+
+
+def bench_menu(frames, seed):
+    game = new_game(seed, render=True)
+    game.menu_enter()
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        game.menu_frame(())
+        samples.append(time.perf_counter() - start)
+    game.menu_exit()
+    return summarize(samples)
+
+
+def bench_allocations(frames, seed, render):
+    # traced memory per frame: peak transient bytes, net bytes kept and net memory blocks kept
+    game = new_game(seed, render)
+    events = script(seed, frames)
+    for frame in events[:50]:
+        game.step(frame)  # let first-frame caches fill before measuring
+    tracemalloc.start()
+    peaks, blocks = [], 0
+    startCurrent = tracemalloc.get_traced_memory()[0]
+    startBlocks = sys.getallocatedblocks()
+    for frame in events[50:]:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        game.step(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    blocks = sys.getallocatedblocks() - startBlocks
+    current = tracemalloc.get_traced_memory()[0] - startCurrent
+    tracemalloc.stop()
+    n = max(1, len(peaks))
+    ordered = sorted(peaks) or [0]
+    return {'frames': len(peaks),
+            'peak_bytes_mean': sum(peaks) / n,
+            'peak_bytes_p99': percentile(ordered, 99),
+            'net_bytes_per_frame': current / n,
+            'net_blocks_per_frame': blocks / n}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args):
+    report = {'meta': {'commit': git_commit(), 'python': platform.python_version(), 'pygame': pg.version.ver,
+                       'frames': args.frames, 'seed': args.seed, 'render': args.render,
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'results': {}}
+    results = report['results']
+    results['startup'] = bench_startup(args.startup_runs, args.seed)
+    results.update(bench_gameplay(args.frames, args.seed, args.render))
+    results['menu.frame'] = bench_menu(args.menu_frames, args.seed)
+    report['alloc'] = bench_allocations(min(args.frames, 1000), args.seed, args.render)
+    return report
+
+
+def compare(report, baseline, threshold):
+    # prints p50/p99 ratios against a baseline report; returns the stages whose median got slower than
+    # threshold (p99 is too noisy on shared machines to gate on, so it is only reported)
+    regressions = []
+    print(f"{'stage':<16}{'base p50':>10}{'p50':>10}{'ratio':>8}{'base p99':>10}{'p99':>10}{'ratio':>8}")
+    for name, now in report['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before or not now.get('n') or not before.get('n'):
+            continue
+        row = [name]
+        for key in ('p50_ms', 'p99_ms'):
+            ratio = now[key] / before[key] if before[key] else float('inf')
+            row += [before[key], now[key], ratio]
+            if key == 'p50_ms' and ratio > 1 + threshold:
+                regressions.append((name, key, ratio))
+        print('{:<16}{:>10.3f}{:>10.3f}{:>8.2f}{:>10.3f}{:>10.3f}{:>8.2f}'.format(*row))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless frame-time benchmarks for Pac-Man Portal')
+    parser.add_argument('--frames', type=int, default=3000, help='gameplay frames to simulate')
+    parser.add_argument('--menu-frames', type=int, default=450, help='menu animation frames to time')
+    parser.add_argument('--startup-runs', type=int, default=3, help='Game.__init__ repetitions')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--render', action='store_true', help='draw gameplay frames (to the dummy display)')
+    parser.add_argument('--out', help='write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown before failing')
+    args = parser.parse_args(argv)
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    report = run(args)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, key, ratio in regressions:
+            print(f'REGRESSION {name} {key} x{ratio:.2f}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,12 @@
 import pygame.font
 
+from assets import assets
+
 
 class Button:
+    HOVER_COLOR = (255, 255, 255)
 
-    def __init__(self, screen, msg):
+    def __init__(self, screen, msg, offset=0):
         self.screen = screen
         self.screen_rect = screen.get_rect()
 
@@ -12,27 +15,65 @@ class Button:
         self.button_color = (0, 0, 0)
         self.text_color = (249, 241, 0)
         self.temp_color = self.text_color
-        self.font = pygame.font.Font('fonts/8-Bit Madness.ttf', 48)
+        self.font = assets.font('fonts/8-Bit Madness.ttf', 48)
 
-        # Build the button's rect object, and center it.
+        # Build the button's rect object, center it and shift it down by offset.
         self.rect = pygame.Rect(0, 0, self.width, self.height)
         self.rect.center = self.screen_rect.center
+        self.rect.top += offset
 
-        self.msg_image = self.font.render(msg, True, self.text_color,
-                                          self.button_color)
-        self.msg_image_rect = self.msg_image.get_rect()
-        self.msg_image_rect.center = self.rect.center
-
+        self.hover = False
         # The button message only needs to be prepped once.
         self.prep_msg(msg)
 
     def prep_msg(self, msg):
-        self.msg_image = self.font.render(msg, True, self.text_color,
-                                          self.button_color)
-        self.msg_image_rect = self.msg_image.get_rect()
+        # normal and hover looks are both rendered up front; hovering only swaps which one is blitted
+        self.images = (self.font.render(msg, True, self.text_color, self.button_color),
+                       self.font.render(msg, True, self.HOVER_COLOR, self.button_color))
+        self.msg_image_rect = self.images[0].get_rect()
         self.msg_image_rect.center = self.rect.center
 
-    def draw_button(self):
+    @property
+    def msg_image(self):
+        return self.images[self.hover]
+
+    @property
+    def bounds(self):
+        # everything draw_button touches (long labels overhang the button rect)
+        return self.rect.union(self.msg_image_rect)
+
+    def set_hover(self, hover):
+        # True when the look changed and the button needs repainting
+        hover = bool(hover)
+        if hover == self.hover:
+            return False
+        self.hover = hover
+        return True
+
+    def draw_button(self, surface=None):
         # Draw blank button, then draw message.
-        self.screen.fill(self.button_color, self.rect)
-        self.screen.blit(self.msg_image, self.msg_image_rect)
+        surface = self.screen if surface is None else surface
+        surface.fill(self.button_color, self.rect)
+        surface.blit(self.msg_image, self.msg_image_rect)
+
+
+class Widgets:
+    # Retained buttons: they live in a DirtyRenderer's background and are only repainted when one of them
+    # changes state, so an idle menu frame costs nothing for them.
+
+    def __init__(self, renderer, buttons):
+        self.renderer = renderer
+        self.buttons = buttons
+
+    def paint(self, surface):
+        for button in self.buttons:
+            button.draw_button(surface)
+
+    def hover(self, pos):
+        for button in self.buttons:
+            if button.set_hover(button.rect.collidepoint(pos)):
+                self.renderer.paint(button.draw_button, button.bounds)
+
+    def clicked(self, pos):
+        # every button under pos, in order
+        return [button for button in self.buttons if button.rect.collidepoint(pos)]
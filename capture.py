@@ -0,0 +1,161 @@
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import zlib
+
+import pygame as pg
+
+from observation import Pixels
+
+# Session video without slowing the game down. FrameCapture.grab() is called once per drawn frame: it copies
+# the window into the next free slot of a preallocated ring (observation.Pixels) and queues the slot for a writer
+# thread, which saves it through a sink. When the writer falls behind and every slot is still waiting, the frame
+# is dropped and counted instead of waited for. The sinks spend their time in file writes, zlib and pipe writes,
+# which release the GIL, so the game thread keeps running while they work.
+#
+#   python pacman_game.py --capture frames/                   # one raw RGB file per frame
+#   python replay.py session.pmr --capture session.mp4        # re-simulate and encode (needs ffmpeg)
+#
+# Sinks:
+#   Files(directory, 'raw' | 'zlib' | 'png')   frame000000.rgb (.rgb.z / .png), plus frames.txt with the size
+#   Encoder(command)                           every frame's bytes piped to a process's stdin, e.g. ffmpeg
+
+RATE = 50  # frames per second the loop runs at (Game.SIM_STEP ms per frame)
+
+
+class Files:
+    EXTENSIONS = {'raw': '.rgb', 'zlib': '.rgb.z', 'png': '.png'}
+
+    def __init__(self, directory, format='raw', level=1):
+        if format not in Files.EXTENSIONS:
+            raise ValueError(f'unknown frame format {format!r}')
+        self.directory, self.format, self.level = directory, format, level
+        self.extension = Files.EXTENSIONS[format]
+        os.makedirs(directory, exist_ok=True)
+
+    def open(self, shape):
+        # shape is (height, width[, 3]); raw frames need it to be read back
+        with open(os.path.join(self.directory, 'frames.txt'), 'w') as f:
+            f.write(f'{shape[1]}x{shape[0]} {"rgb24" if len(shape) == 3 else "gray"} {RATE}fps\n')
+
+    def write(self, number, frame):
+        path = os.path.join(self.directory, f'frame{number:06d}{self.extension}')
+        if self.format == 'png':
+            image = pg.image.frombuffer(frame.tobytes(), frame.shape[1::-1], 'RGB') if frame.ndim == 3 else \
+                pg.surfarray.make_surface(frame.T)
+            pg.image.save(image, path)
+            return
+        data = frame.data if frame.flags.c_contiguous else frame.tobytes()
+        with open(path, 'wb') as f:
+            f.write(zlib.compress(data, self.level) if self.format == 'zlib' else data)
+
+    def close(self):
+        pass
+
+
+class Encoder:
+    # pipes raw frames to a local process; {width} {height} {rate} {pixels} in the command are filled in
+    FFMPEG = 'ffmpeg -loglevel error -y -f rawvideo -pix_fmt {pixels} -s {width}x{height} -r {rate} -i - ' \
+             '-pix_fmt yuv420p {out}'
+
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+
+    @staticmethod
+    def ffmpeg(out):
+        return Encoder(Encoder.FFMPEG.replace('{out}', shlex.quote(out).replace('{', '{{').replace('}', '}}')))
+
+    def open(self, shape):
+        command = self.command.format(width=shape[1], height=shape[0], rate=RATE,
+                                      pixels='rgb24' if len(shape) == 3 else 'gray')
+        self.process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE)
+
+    def write(self, number, frame):
+        self.process.stdin.write(frame.data if frame.flags.c_contiguous else frame.tobytes())
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+
+
+class FrameCapture:
+    SLOTS = 8  # frames that can wait for the writer before new ones are dropped
+
+    def __init__(self, surface, sink, step=1, gray=False, slots=SLOTS, wait=False):
+        # wait=True blocks grab() on a full ring instead of dropping: for offline exports such as replays
+        self.sink = sink
+        self.wait = wait
+        self.pixels = Pixels(surface, step, gray, ring=slots)
+        # Pixels fills its ring in order and the writer empties it in the same order, so while a slot is free
+        # the next one Pixels will use is free
+        self.free = threading.Semaphore(slots)
+        self.queue = queue.SimpleQueue()
+        self.captured = self.written = self.dropped = 0
+        self.error = None
+        self.sink.open(self.pixels.shape)
+        self.writer = threading.Thread(target=self.drain, name='frame writer', daemon=True)
+        self.writer.start()
+
+    def grab(self):
+        # game thread, after a frame is drawn: never blocks unless wait is set
+        if not self.free.acquire(blocking=self.wait):
+            self.dropped += 1
+            return False
+        self.pixels.capture()
+        self.queue.put((self.captured + self.dropped, self.pixels.index))
+        self.captured += 1
+        return True
+
+    def drain(self):
+        ring = self.pixels.ring
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            number, index = item
+            try:
+                if self.error is None:
+                    self.sink.write(number, ring[index])
+                    self.written += 1
+            except (OSError, ValueError) as error:
+                # a full disk or an encoder that quit: keep draining so grab() never waits, report on close
+                self.error = error
+            finally:
+                self.free.release()
+
+    def stats(self):
+        return {'captured': self.captured, 'written': self.written, 'dropped': self.dropped,
+                'error': None if self.error is None else str(self.error)}
+
+    def close(self):
+        # waits for queued frames to be written; returns stats()
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+            try:
+                self.sink.close()
+            except OSError as error:
+                self.error = self.error or error
+        return self.stats()
+
+
+def sink(target, format='raw'):
+    # a directory gets frame files; a video file name goes to ffmpeg; '|command' pipes to any other encoder
+    if target.startswith('|'):
+        return Encoder(target[1:])
+    if os.path.splitext(target)[1] in ('.mp4', '.mkv', '.webm', '.avi', '.mov', '.gif'):
+        return Encoder.ffmpeg(target)
+    return Files(target, format)
+
+
+def report(capture):
+    # close and print the counts, e.g. at exit
+    stats = capture.close()
+    print(f"captured {stats['captured']} frames, wrote {stats['written']}, dropped {stats['dropped']}"
+          + (f", writer failed: {stats['error']}" if stats['error'] else ''), file=sys.stderr)
+    return stats
@@ -0,0 +1,112 @@
+from array import array
+
+from vector import Vector
+
+
+class EntityStore:
+    # Actor state kept column-wise: one slot per actor in each array, indexed by the actor's id. Player, Enemy
+    # and Portal objects are thin views that read and write their own slot, so per-frame work can walk the
+    # columns directly instead of building Vectors. Positions stay as the pg.Rects collision and blitting
+    # consume; the store owns them and they are only ever mutated in place.
+    PLAYER, ENEMY, PORTAL = 0, 1, 2
+    COLUMNS = ('vx', 'vy', 'frame', 'direction', 'startF', 'endF')
+
+    def __init__(self):
+        self.kind = array('b')
+        self.rects = []
+        self.vx, self.vy = array('i'), array('i')
+        self.frame, self.direction = array('i'), array('i')  # animation frame, ping-pong direction
+        self.startF, self.endF = array('i'), array('i')  # animation loop bounds
+
+    def __len__(self):
+        return len(self.kind)
+
+    def add(self, kind, rect, vx=0, vy=0):
+        self.kind.append(kind)
+        self.rects.append(rect)
+        for column, value in ((self.vx, vx), (self.vy, vy), (self.frame, 0), (self.direction, 0),
+                              (self.startF, 0), (self.endF, 1)):
+            column.append(whole(value))
+        return len(self.kind) - 1
+
+    def snapshot(self):
+        # copies of every column and position, for restore()
+        return [getattr(self, name)[:] for name in self.COLUMNS], [tuple(rect) for rect in self.rects]
+
+    def restore(self, snapshot):
+        # put every slot back as it was when snapshot() was taken (rects are updated in place)
+        columns, rects = snapshot
+        for name, saved in zip(self.COLUMNS, columns):
+            getattr(self, name)[:] = saved
+        for rect, saved in zip(self.rects, rects):
+            rect.update(saved)
+
+    def of_kind(self, kind):
+        return [i for i, k in enumerate(self.kind) if k == kind]
+
+    def moving(self, i):
+        return self.vx[i] != 0 or self.vy[i] != 0
+
+    def cycle(self, ids, always=False):
+        # step the looping startF..endF animation of every entity in ids (only the moving ones unless always)
+        frame, startF, endF, vx, vy = self.frame, self.startF, self.endF, self.vx, self.vy
+        for i in ids:
+            if always or vx[i] or vy[i]:
+                f = frame[i]
+                frame[i] = f + 1 if startF[i] <= f < endF[i] else startF[i]
+
+    def bounce(self, ids, last):
+        # ping-pong frames 0..last for every moving entity in ids (Pac-Man's chomp)
+        frame, direction, vx, vy = self.frame, self.direction, self.vx, self.vy
+        for i in ids:
+            if vx[i] or vy[i]:
+                if direction[i] == 0:
+                    if frame[i] < last:
+                        frame[i] += 1
+                    else:
+                        direction[i] = 1
+                elif frame[i] > 0:
+                    frame[i] -= 1
+                else:
+                    direction[i] = 0
+
+
+def whole(value):
+    # the columns are C ints: refuse a fractional value instead of letting int() truncate it silently
+    if value != int(value):
+        raise ValueError(f'entity columns hold whole numbers, got {value!r}')
+    return int(value)
+
+
+def column(name):
+    # view attribute backed by the named store column
+    def get(self):
+        return getattr(self.store, name)[self.id]
+
+    def set(self, value):
+        getattr(self.store, name)[self.id] = whole(value)
+
+    return property(get, set)
+
+
+class Entity:
+    # view over one slot of an EntityStore; a standalone actor gets a private store
+    KIND = None
+
+    def __init__(self, rect, velocity, store=None):
+        self.store = EntityStore() if store is None else store
+        self.id = self.store.add(self.KIND, rect, velocity.x, velocity.y)
+        self.rect = rect
+
+    currentFrame = column('frame')
+    animationDirection = column('direction')
+    startF = column('startF')
+    endF = column('endF')
+
+    @property
+    def velocity(self):
+        return Vector(self.store.vx[self.id], self.store.vy[self.id])
+
+    @velocity.setter
+    def velocity(self, value):
+        self.store.vx[self.id], self.store.vy[self.id] = whole(value.x), whole(value.y)
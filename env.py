@@ -0,0 +1,117 @@
+import random
+
+import numpy as np
+
+from batch import BatchSim
+from observation import Pixels, Tiles
+from pacman_game import KEYS, Game, Player
+
+# Gym-style control for agents: reset() returns an observation, step(action) returns (observation, reward, done,
+# info) and nothing is drawn. Env drives one full Game; VecEnv steps n games per call on BatchSim's arrays, so
+# a batch of actions costs a handful of NumPy operations instead of n trips through the game objects.
+#
+# Actions are BatchSim's: NOOP, LEFT, RIGHT, UP, DOWN, BLUE (portal), ORANGE (portal). The reward is the score
+# gained by the step. Observations are dicts of NumPy arrays (a leading axis of n for VecEnv):
+#
+#   player (2,)  ghosts (4, 2)  portals (2, 2)   top-left corners; ghosts in blinky, pinky, inky, clyde order
+#   portalActive (2,)  facing ()  pellets (tiles,)  power (4,)  score ()  lives ()  level ()  bluemode ()
+#
+# facing is 0 right, 1 left, 2 down, 3 up; pellets is the maze's lattice (maze.Lattice), 1 where one is left.
+# Env(observation='pixels') returns the drawn window instead (see observation.Pixels, step and gray shrink it)
+# and Env(observation='tiles') a (6, rows, cols) array of 0/1 planes (observation.Tiles). Both arrays are
+# reused: copy them to keep them past the next steps.
+
+ACTIONS = ('NOOP', 'LEFT', 'RIGHT', 'UP', 'DOWN', 'BLUE', 'ORANGE')
+
+
+class Env:
+    # One Game, stepped a frame per action. Level-ups raise the speed class attributes, so reset() puts them
+    # back and only one Env should play per process (use runner.py or VecEnv for more).
+
+    def __init__(self, maze=Game.MAZE, maxFrames=None, observation='state', step=1, gray=False):
+        import pygame as pg
+        self.game = Game(title='Pac-Man env', headless=True, maze=maze)
+        if observation == 'pixels':
+            self.game.render = True  # still headless: frames are drawn to the dummy display's surface
+            self.observe = Pixels(self.game.surface, step, gray).capture
+        elif observation == 'tiles':
+            self.observe = Tiles(self.game).observe
+        elif observation != 'state':
+            raise ValueError(f'unknown observation {observation!r}')
+        self.events = [()] + [[pg.event.Event(pg.KEYDOWN, key=key)] for key in KEYS]  # one per action
+        self.maxFrames = maxFrames
+        self.frame = 0
+
+    def reset(self, seed=None):
+        # the game itself is deterministic; seed is for the agent's sake (and Python's random module)
+        if seed is not None:
+            random.seed(seed)
+        self.game.reset()
+        self.frame = 0
+        return self.observe()
+
+    def step(self, action):
+        game = self.game
+        score = game.score
+        game.step(self.events[action])
+        self.frame += 1
+        if game.finished:
+            # the game has already reset its board for the next one; the final score is in lastScore
+            reward = game.lastScore - score
+        else:
+            reward = game.score - score
+        truncated = self.maxFrames is not None and self.frame >= self.maxFrames
+        return self.observe(), reward, game.finished or truncated, \
+            {'frame': self.frame, 'truncated': truncated and not game.finished,
+             'score': game.lastScore if game.finished else game.score}
+
+    def observe(self):
+        game = self.game
+        player = game.player
+        return {'player': np.array(player.rect.topleft, np.int32),
+                'ghosts': np.array([ghost.rect.topleft for ghost in game.ghosts], np.int32),
+                'portals': np.array([game.bluePortal.rect.topleft, game.oranPortal.rect.topleft], np.int32),
+                'portalActive': np.array([game.bluePortal.active, game.oranPortal.active], bool),
+                'facing': np.int32(Player.ANGLES.index(player.currentAngle)),
+                'pellets': np.frombuffer(game.grid.pellets, np.uint8).astype(bool),
+                'power': np.frombuffer(game.grid.power, np.uint8).astype(bool),
+                'score': np.int64(game.score), 'lives': np.int32(player.lives), 'level': np.int32(game.level),
+                'bluemode': np.bool_(game.bluemode)}
+
+
+class VecEnv:
+    # n games stepped together on BatchSim (its rule differences apply: no death animation). Finished games are
+    # reset automatically; their final score and level come back in info for that step.
+
+    def __init__(self, n, game=None, maxFrames=None, **speeds):
+        if game is None:
+            game = Game(title='Pac-Man vec env', headless=True)
+        self.sim = BatchSim(game, n, **speeds)
+        self.n = n
+        self.maxFrames = maxFrames
+
+    def reset(self, seed=None):
+        if seed is not None:
+            random.seed(seed)
+        self.sim.reset()
+        return self.observe()
+
+    def step(self, actions):
+        sim = self.sim
+        score = sim.score.copy()
+        sim.step(actions)
+        rewards = sim.score - score
+        truncated = np.zeros(self.n, bool) if self.maxFrames is None else sim.frame >= self.maxFrames
+        dones = sim.done | truncated
+        info = {'score': sim.score.copy(), 'level': sim.level.copy(), 'frame': sim.frame.copy(),
+                'truncated': truncated & ~sim.done}
+        if dones.any():
+            sim.reset(dones)
+        return self.observe(), rewards, dones, info
+
+    def observe(self):
+        sim = self.sim
+        return {'player': sim.player.copy(), 'ghosts': sim.ghosts.copy(), 'portals': sim.portals.copy(),
+                'portalActive': sim.portalActive.copy(), 'facing': sim.facing.copy(), 'pellets': sim.pellets.copy(),
+                'power': sim.power.copy(), 'score': sim.score.copy(), 'lives': sim.lives.copy(),
+                'level': sim.level.copy(), 'bluemode': sim.bluemode.copy()}
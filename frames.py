@@ -0,0 +1,38 @@
+import pygame as pg
+
+
+class FrameCache:
+    SCALE = 0.06
+
+    def __init__(self):
+        # (path, angle, scale) -> pre-rotated, pre-scaled surface
+        self.frames = {}
+        self.load = pg.image.load  # source decoder; the game points this at its asset bundle
+
+    def __len__(self):
+        return len(self.frames)
+
+    def get(self, path, angle=0, scale=SCALE):
+        key = (path, angle, scale)
+        frame = self.frames.get(key)
+        if frame is None:
+            frame = self.frames[key] = pg.transform.rotozoom(self.load(path), angle, scale)
+        return frame
+
+    def preload(self, paths, angles=(0,), scale=SCALE):
+        # decode each source once, then keep only the small transformed copies
+        for path in paths:
+            missing = [a for a in angles if (path, a, scale) not in self.frames]
+            if not missing:
+                continue
+            source = self.load(path)
+            for angle in missing:
+                self.frames[(path, angle, scale)] = pg.transform.rotozoom(source, angle, scale)
+
+    def missing(self, paths, angles=(0,), scale=SCALE):
+        # sources that preload() would still have to decode
+        return [path for path in paths if any((path, a, scale) not in self.frames for a in angles)]
+
+    def clear(self):
+        self.frames.clear()
+
@@ -0,0 +1,43 @@
+import pygame as pg
+
+
+class TextCache:
+
+    def __init__(self, font):
+        self.font = font
+        self.surfaces = {}
+
+    def render(self, text, color, background):
+        key = (text, color, background)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = self.font.render(text, True, color, background)
+        return surface
+
+
+class Label:
+    # "Score: 120" style text that is only rebuilt when its value changes. The prefix is rasterized once
+    # and the value is laid out from cached per-character glyphs, so a new score costs a few blits.
+
+    def __init__(self, cache, prefix, center, color, background):
+        self.cache = cache
+        self.prefix = prefix
+        self.center = center
+        self.color, self.background = color, background
+        self.value = None
+        self.image, self.rect = None, None
+
+    def set(self, value):
+        if self.image is not None and value == self.value:
+            return False
+        self.value = value
+        parts = [self.cache.render(self.prefix, self.color, self.background)]
+        parts += [self.cache.render(ch, self.color, self.background) for ch in str(value)]
+        self.image = pg.Surface((sum(p.get_width() for p in parts), max(p.get_height() for p in parts)))
+        self.image.fill(self.background)
+        x = 0
+        for part in parts:
+            self.image.blit(part, (x, 0))
+            x += part.get_width()
+        self.rect = self.image.get_rect(center=self.center)
+        return True
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+
+import pygame as pg
+
+import navigation
+import walls
+from navigation import NavGrid
+from walls import WallIndex
+
+# A level file (mazes/*.json) holds only what a designer edits: brick and wall rects, the pellet lattice, power
+# pellet and spawn positions, scatter corners and the ghost graph's bounds. Everything derived from it (wall
+# indexes, pellet layout, nav graph, scatter flow fields) is compiled once and pickled under mazes/.cache, keyed
+# by a hash of the file and of the code that compiles it, so later starts load it instead of rebuilding it.
+#
+#   "bricks"      drawn blocks; pellets are carved out from under them
+#   "walls"       what Pac-Man collides with
+#   "ghostWalls"  what ghosts collide with and navigate around (defaults to "walls")
+
+
+class Lattice:
+    # Pellets sit on a fixed lattice: tile (row, col) holds a pebble at (left + col * pitch, top + row * pitch)
+
+    def __init__(self, rows, cols, left, top, pitch, size):
+        self.rows, self.cols = rows, cols
+        self.left, self.top, self.pitch = left, top, pitch
+        self.size = size  # pebble width
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def position(self, i):
+        return self.left + (i % self.cols) * self.pitch, self.top + (i // self.cols) * self.pitch
+
+    def tile_span(self, rect):
+        # inclusive (row0, row1, col0, col1) of the tiles whose pebble overlaps rect
+        col0 = max(0, (rect.left - self.left - self.size) // self.pitch + 1)
+        col1 = min(self.cols - 1, (rect.right - 1 - self.left) // self.pitch)
+        row0 = max(0, (rect.top - self.top - self.size) // self.pitch + 1)
+        row1 = min(self.rows - 1, (rect.bottom - 1 - self.top) // self.pitch)
+        return row0, row1, col0, col1
+
+    def carve(self, rects):
+        # the full lattice minus every tile whose pebble would sit under one of rects
+        layout = bytearray(b'\x01') * len(self)
+        for rect in rects:
+            row0, row1, col0, col1 = self.tile_span(rect)
+            if col0 > col1:
+                continue
+            for row in range(row0, row1 + 1):
+                base = row * self.cols
+                layout[base + col0:base + col1 + 1] = bytes(col1 - col0 + 1)
+        return bytes(layout)
+
+
+def code_digest(*modules):
+    # the source of the modules that build a maze's compiled data, so editing them invalidates old caches
+    digest = hashlib.sha1()
+    for module in modules:
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+class Maze:
+    CACHE = os.path.join('mazes', '.cache')
+    VERSION = 1  # bump when the compiled data changes shape
+    CODE = code_digest(walls, navigation, sys.modules[__name__])
+
+    def __init__(self, path, cache=CACHE):
+        with open(path, 'rb') as f:
+            source = f.read()
+        data = json.loads(source)
+        self.path = path
+        self.name = data.get('name', os.path.splitext(os.path.basename(path))[0])
+        self.key = hashlib.sha1(source + Maze.CODE + b'%d' % Maze.VERSION).hexdigest()
+
+        self.bricks = [pg.Rect(rect) for rect in data['bricks']]
+        self.walls = [pg.Rect(rect) for rect in data['walls']]
+        self.ghostWalls = [pg.Rect(rect) for rect in data['ghostWalls']] if 'ghostWalls' in data else self.walls
+        self.lattice = Lattice(**data['pellets'])
+        self.power = [tuple(pos) for pos in data['power']]
+        self.spawns = {name: tuple(pos) for name, pos in data['spawns'].items()}
+        self.scatter = {name: tuple(pos) for name, pos in data['scatter'].items()}
+        self.bounds = data['nav']
+
+        self.cachePath = cache and os.path.join(cache, f'{self.name}-{self.key}.pickle')
+        compiled = self.load()
+        if compiled is None:
+            compiled = self.compile()
+            self.save(compiled)
+        self.wallIndex, self.ghostWallIndex, self.layout, self.navGrid, self.homeFields = compiled
+
+    def compile(self):
+        wallIndex = WallIndex(self.walls)
+        ghostWallIndex = wallIndex if self.ghostWalls is self.walls else WallIndex(self.ghostWalls)
+        layout = self.lattice.carve(self.bricks)
+        b = self.bounds
+        nav = NavGrid(ghostWallIndex, b['size'], b['cell'], (b['left'], b['top'], b['right'], b['bottom']))
+        # scatter targets never move, so their fields are worked out here once for every start
+        homeFields = {name: nav.flow_field(nav.nearest(*corner)) for name, corner in self.scatter.items()}
+        return wallIndex, ghostWallIndex, layout, nav, homeFields
+
+    def load(self):
+        # a stale or damaged cache is just rebuilt
+        if not self.cachePath:
+            return None
+        try:
+            with open(self.cachePath, 'rb') as f:
+                compiled = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, AttributeError, ValueError, ImportError, TypeError, IndexError,
+                KeyError):
+            # unreadable, or pickled against classes that have since moved or changed
+            return None
+        return compiled if isinstance(compiled, tuple) and len(compiled) == 5 else None
+
+    def save(self, compiled):
+        # written beside the final name and renamed, so a second game starting meanwhile never reads half a file
+        if not self.cachePath:
+            return
+        tmp = f'{self.cachePath}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.cachePath), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                pickle.dump(compiled, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.cachePath)
+        except OSError:
+            pass  # read-only install: compile on every start
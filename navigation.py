@@ -0,0 +1,156 @@
+from collections import deque
+
+import pygame as pg
+
+
+class NavGrid:
+    # Every spot on a CELL-pixel lattice where a ghost-sized rect fits between the walls is a node;
+    # nodes link to their walkable up/left/down/right neighbours. Built once from the static walls.
+    CELL = 10
+    LEFT, TOP, RIGHT, BOTTOM = -20, 75, 575, 620
+    UNREACHABLE = 1 << 30
+
+    def __init__(self, wallIndex, size=25, cell=CELL, bounds=(LEFT, TOP, RIGHT, BOTTOM)):
+        self.cell = cell
+        self.left, self.top, right, bottom = bounds
+        self.cols = (right - self.left) // cell + 1
+        self.rows = (bottom - self.top) // cell + 1
+        count = self.cols * self.rows
+
+        self.walkable = bytearray(count)
+        for i in range(count):
+            x, y = self.position(i)
+            if not wallIndex.collide(pg.Rect(x, y, size, size)):
+                self.walkable[i] = 1
+
+        # links[i][d] is the node one step away in DIRECTIONS[d], or None
+        self.links = [None] * count
+        for i in range(count):
+            if self.walkable[i]:
+                col, row = i % self.cols, i // self.cols
+                self.links[i] = tuple(self.node(col + dx, row + dy) for dx, dy in GhostAI.DIRECTIONS)
+        self.nodes = [i for i in range(count) if self.walkable[i]]
+        self.adjacent = [tuple(j for j in links if j is not None) if links else () for links in self.links]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def position(self, i):
+        return self.left + (i % self.cols) * self.cell, self.top + (i // self.cols) * self.cell
+
+    def node(self, col, row):
+        if 0 <= col < self.cols and 0 <= row < self.rows and self.walkable[row * self.cols + col]:
+            return row * self.cols + col
+        return None
+
+    def nearest(self, x, y):
+        # walkable node closest to (x, y); the four surrounding lattice spots almost always have one
+        col, row = (x - self.left) // self.cell, (y - self.top) // self.cell
+        best, bestD = None, None
+        for c, r in ((col, row), (col + 1, row), (col, row + 1), (col + 1, row + 1)):
+            i = self.node(c, r)
+            if i is not None:
+                nx, ny = self.position(i)
+                d = (nx - x) ** 2 + (ny - y) ** 2
+                if best is None or d < bestD:
+                    best, bestD = i, d
+        if best is None:
+            best = min(self.nodes, key=lambda n: (self.position(n)[0] - x) ** 2 + (self.position(n)[1] - y) ** 2)
+        return best
+
+    def flow_field(self, source):
+        # breadth-first step counts from source to every node
+        dist = [NavGrid.UNREACHABLE] * len(self.walkable)
+        dist[source] = 0
+        queue, adjacent = deque([source]), self.adjacent
+        while queue:
+            i = queue.popleft()
+            d = dist[i] + 1
+            for j in adjacent[i]:
+                if dist[j] > d:
+                    dist[j] = d
+                    queue.append(j)
+        return dist
+
+
+class GhostAI:
+    DIRECTIONS = ((0, -1), (-1, 0), (0, 1), (1, 0))  # also the tie-break order: up, left, down, right
+    SCATTER, CHASE = 350, 1000  # frames per phase, repeating
+
+    def __init__(self, nav, homes, fields=None):
+        self.nav = nav
+        # scatter targets never move, so their fields are computed once (or handed in precompiled, see maze.py)
+        fields = fields or {}
+        self.homes = {ghost: fields[ghost] if ghost in fields else nav.flow_field(nav.nearest(*corner))
+                      for ghost, corner in homes.items()}
+        self.state = {}  # ghost -> (node it is heading for, direction index it is travelling in)
+        self.target, self.field = None, None
+        self.frame = 0
+
+    def scattering(self):
+        return self.frame % (GhostAI.SCATTER + GhostAI.CHASE) < GhostAI.SCATTER
+
+    def track(self, rect):
+        # the chase field is shared by every ghost and only rebuilt when Pac-Man reaches a new node
+        node = self.nav.nearest(rect.left, rect.top)
+        if node != self.target:
+            self.target, self.field = node, self.nav.flow_field(node)
+
+    def tick(self):
+        self.frame += 1
+
+    def reset(self):
+        self.state.clear()
+        self.frame = 0
+
+    def choose(self, node, heading, field, flee):
+        # cheapest neighbour by field lookup; ghosts only turn back when there is nothing else
+        best, bestScore = None, None
+        for d, nxt in enumerate(self.nav.links[node]):
+            if nxt is None or (heading is not None and d == (heading + 2) % 4):
+                continue
+            score = -field[nxt] if flee else field[nxt]
+            if best is None or score < bestScore:
+                best, bestScore = d, score
+        if best is None and heading is not None:
+            best = (heading + 2) % 4
+            if self.nav.links[node][best] is None:
+                return None, heading
+        return (self.nav.links[node][best], best) if best is not None else (None, heading)
+
+    def steer(self, ghost, speed, frightened=False):
+        # walk speed pixels along the lattice and return the (dx, dy) that gets the ghost there
+        nav = self.nav
+        if frightened:
+            field, flee = self.field, True
+        elif self.scattering() and ghost in self.homes:
+            field, flee = self.homes[ghost], False
+        else:
+            field, flee = self.field, False
+
+        x0, y0 = ghost.rect.left, ghost.rect.top
+        x, y = x0, y0
+        target, heading = self.state.get(ghost, (None, None))
+        budget = speed
+        while budget > 0:
+            if target is not None:
+                tx, ty = nav.position(target)
+                # a teleport or respawn moved the ghost off its track: snap back onto the lattice
+                if (tx != x and ty != y) or abs(tx - x) + abs(ty - y) > nav.cell:
+                    target = None
+            if target is None:
+                target = nav.nearest(x, y)
+                tx, ty = nav.position(target)
+            if (x, y) == (tx, ty):
+                target, heading = self.choose(target, heading, field, flee)
+                if target is None:
+                    break
+                continue
+            step = min(budget, abs(tx - x))
+            x += step if tx > x else -step
+            budget -= step
+            step = min(budget, abs(ty - y))
+            y += step if ty > y else -step
+            budget -= step
+        self.state[ghost] = (target, heading)
+        return x - x0, y - y0
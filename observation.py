@@ -0,0 +1,115 @@
+import sys
+
+import numpy as np
+import pygame as pg
+
+# Observations for pixel-based agents and frame analytics without copying the window every frame.
+#
+# Pixels reads Game.surface through a NumPy view of its pixel memory (no tostring copy), optionally takes every
+# nth pixel and converts to grayscale, and writes the result straight into a preallocated ring of arrays, so
+# the only copy is the (usually much smaller) observation itself. Tiles is a symbolic alternative:
+# walls, pellets, power pellets, Pac-Man, ghosts and portals as 0/1 planes over a coarse grid of the window.
+
+
+class Pixels:
+    RING = 4  # observations kept before a slot is reused (enough to stack the last few frames)
+    GRAY = (77, 150, 29)  # ITU-R 601 luma weights in 1/256ths
+
+    def __init__(self, surface, step=1, gray=False, ring=RING):
+        self.surface = surface
+        self.step = step
+        self.gray = gray
+        w, h = surface.get_size()
+        # a strided [::step] slice of a side of n pixels has ceil(n / step) of them
+        self.shape = (-(-h // step), -(-w // step)) + (() if gray else (3,))
+        self.ring = np.empty((ring,) + self.shape, np.uint8)
+        self.scratch = np.empty((2,) + self.shape[:2], np.uint16)  # luma sum and one weighted channel
+        self.index = -1
+
+    def view(self):
+        # the live pixels as a (height, width, 3) RGB array. It locks the surface, so drop it before the next blit.
+        surface = self.surface
+        if surface.get_bytesize() == 4:
+            # rows of 32-bit pixels as bytes, with the colour bytes picked out by strides rather than copied
+            # (surfarray.pixels3d gives the same view x-major, which copies out several times slower)
+            w, h = surface.get_size()
+            pixels = np.frombuffer(surface.get_buffer(), np.uint8).reshape(h, -1)[:, :4 * w].reshape(h, w, 4)
+            r, g, b = (shift // 8 if sys.byteorder == 'little' else 3 - shift // 8
+                       for shift in surface.get_shifts()[:3])
+            if (r, g, b) == (2, 1, 0):
+                return pixels[..., 2::-1]
+            if (r, g, b) == (0, 1, 2) or (r, g, b) == (1, 2, 3):
+                return pixels[..., r:r + 3]
+        return pg.surfarray.pixels3d(surface).transpose(1, 0, 2)
+
+    def capture(self):
+        # the current frame into the next ring slot; returns that slot (overwritten RING captures later)
+        self.index = (self.index + 1) % len(self.ring)
+        out = self.ring[self.index]
+        pixels = self.view()[::self.step, ::self.step]
+        if self.gray:
+            luma, channel = self.scratch
+            np.multiply(pixels[..., 0], Pixels.GRAY[0], out=luma, dtype=np.uint16)
+            for c in (1, 2):
+                np.multiply(pixels[..., c], Pixels.GRAY[c], out=channel, dtype=np.uint16)
+                luma += channel
+            np.right_shift(luma, 8, out=out, casting='unsafe')
+        else:
+            for c in range(3):  # a channel at a time: plain strided copies NumPy does fast
+                out[..., c] = pixels[..., c]
+        del pixels  # unlock the surface
+        return out
+
+    def stack(self, count=None):
+        # the last count captures, oldest first (a copy)
+        count = len(self.ring) if count is None else count
+        order = [(self.index - i) % len(self.ring) for i in reversed(range(count))]
+        return self.ring[order]
+
+
+class Tiles:
+    CELL = 10  # pixels per tile
+    WALL, PELLET, POWER, PLAYER, GHOST, PORTAL = range(6)
+
+    def __init__(self, game, cell=CELL):
+        self.game = game
+        self.cell = cell
+        self.rows, self.cols = -(-game.WINDOW_HEIGHT // cell), -(-game.WINDOW_WIDTH // cell)
+        self.planes = np.zeros((6, self.rows, self.cols), np.uint8)
+        self.walls = np.zeros((self.rows, self.cols), np.uint8)
+        for wall in game.walls:
+            self.fill(self.walls, wall.rect)
+        # tile under the centre of every pellet / power pellet, in grid order
+        half = game.grid.size // 2
+        self.pelletTiles = self.tiles([(x + half, y + half) for x, y in game.grid.positions])
+        self.powerTiles = self.tiles([rect.center for rect in game.grid.powerRects])
+
+    def tiles(self, points):
+        points = np.array(points, np.int32).reshape(-1, 2)
+        cols = np.clip(points[:, 0] // self.cell, 0, self.cols - 1)
+        rows = np.clip(points[:, 1] // self.cell, 0, self.rows - 1)
+        return rows * self.cols + cols
+
+    def fill(self, plane, rect):
+        # mark every tile rect overlaps (clipped to the window)
+        cell = self.cell
+        row0, row1 = max(0, rect.top // cell), min(self.rows, (rect.bottom - 1) // cell + 1)
+        col0, col1 = max(0, rect.left // cell), min(self.cols, (rect.right - 1) // cell + 1)
+        if row0 < row1 and col0 < col1:
+            plane[row0:row1, col0:col1] = 1
+
+    def observe(self):
+        # refreshes and returns the planes array in place: (6, rows, cols), indexed by WALL ... PORTAL
+        game, planes = self.game, self.planes
+        planes[...] = 0
+        planes[Tiles.WALL] = self.walls
+        grid = game.grid
+        planes[Tiles.PELLET].reshape(-1)[self.pelletTiles] = np.frombuffer(grid.pellets, np.uint8)
+        planes[Tiles.POWER].reshape(-1)[self.powerTiles] = np.frombuffer(grid.power, np.uint8)
+        self.fill(planes[Tiles.PLAYER], game.player.rect)
+        for ghost in game.ghosts:
+            self.fill(planes[Tiles.GHOST], ghost.rect)
+        for portal in (game.bluePortal, game.oranPortal):
+            if portal.active:
+                self.fill(planes[Tiles.PORTAL], portal.rect)
+        return planes
@@ -1,41 +1,27 @@
+import atexit
+import os
 import time
 import sys
 import pygame as pg
-import random
-from button import Button
+from itertools import compress, repeat
+from assets import assets
+from button import Button, Widgets
+from entities import Entity, EntityStore
+from frames import FrameCache
+from navigation import GhostAI
+from hud import Label, TextCache
+from maze import Maze
+from profiler import Profiler
+from render import DirtyRenderer
+from scores import HighScores
 from pygame.locals import *
 from pygame.sprite import Sprite
 from vector import Vector
+from walls import Wall
 
-
-# -------------------------------------------------------------------------------------
-class Node(Sprite):
-
-    def __init__(self, game):
-        super().__init__()
-        self.game = game
-        self.screen = self.game.surface
-
-        self.image = pg.image.load('images/pebble.png')
-        self.rect = self.image.get_rect()
-
-        self.rect.left = self.rect.width
-        self.rect.top = self.rect.height
-        self.x = float(self.rect.x)
-
-    def width(self): return self.rect.width
-
-    def height(self): return self.rect.height
-
-    def check_edges(self):
-        r = self.rect
-        s_r = self.screen.get_rect()
-        return r.right >= s_r.right or r.left <= 0
-
-    def draw(self): self.screen.blit(self.image, self.rect)
-
-    def update(self):
-        self.draw()
+frames = FrameCache()
+# the keys a bot or script presses: move left, right, up, down, fire the blue portal, fire the orange portal
+KEYS = (K_LEFT, K_RIGHT, K_UP, K_DOWN, K_c, K_v)
 
 
 # -------------------------------------------------------------------------------------
@@ -70,42 +56,63 @@ class Fruit(Sprite):
 
 # -------------------------------------------------------------------------------------
 class Grid:
+    # Pellets sit on the maze's lattice (see maze.Lattice), one byte per tile
 
     def __init__(self, game):
         self.dir = 0
-        self.nodes = pg.sprite.Group()
-        self.powerNodes = pg.sprite.Group()
         self.screen = game.surface
         self.game = game
 
-    def create_node(self, n, row):
-        node = Node(game=self.game)
-        rect = node.rect
-        width, height = rect.size
-        node.x = width + 2 * n * (width / 4)
-        rect.x = node.x
-        rect.y = rect.height + 2 * (height / 4) * row
-        self.nodes.add(node)
-
-    def create_powerNode(self, n, row):
-        superNode = Node(game=self.game)
-        superNode.image = pg.image.load('images/powerPebble.png')
-        # superNode.image = pg.image.load('images/powerPebble2.png')
-        rect = superNode.rect
-        width, height = rect.size
-        superNode.x = width + 2 * n * (width / 4)
-        rect.x = superNode.x
-        rect.y = rect.height + 2 * (height / 4) * row
-        self.powerNodes.add(superNode)
+        self.image = assets.image('images/pebble.png')
+        self.powerImage = assets.image('images/powerPebble.png')
+        # self.powerImage = pg.image.load('images/powerPebble2.png')
+        self.size = self.image.get_width()
+
+        # One byte per tile: 1 = pellet present. layout (precompiled with the maze) is what reset_grid copies in.
+        self.lattice = game.maze.lattice
+        self.tile_span = self.lattice.tile_span
+        self.layout = game.maze.layout
+        self.pellets = bytearray(len(self.layout))
+        self.remaining = 0
+        self.positions = [self.lattice.position(i) for i in range(len(self.layout))]
+
+        # a power pellet's hit rect is pebble-sized at its top-left; the larger image is drawn from the same corner
+        self.powerRects = [pg.Rect(pos, (self.size, self.size)) for pos in game.maze.power]
+        self.power = bytearray(len(self.powerRects))
+        # set whenever the pellet set changes wholesale and the renderer's background must be rebuilt
+        self.repaint = True
+
+    def eat(self, rect):
+        # remove every pellet under rect and return how many were removed
+        row0, row1, col0, col1 = self.tile_span(rect)
+        pellets, eaten, cols = self.pellets, 0, self.lattice.cols
+        for row in range(row0, row1 + 1):
+            base = row * cols
+            for i in range(base + col0, base + col1 + 1):
+                if pellets[i]:
+                    pellets[i] = 0
+                    eaten += 1
+                    if self.game.render:
+                        self.game.renderer.erase(pg.Rect(self.positions[i], (self.size, self.size)), self.draw_over)
+        self.remaining -= eaten
+        return eaten
+
+    def eat_power(self, rect):
+        hit = False
+        for i, powerRect in enumerate(self.powerRects):
+            if self.power[i] and rect.colliderect(powerRect):
+                self.power[i] = 0
+                hit = True
+                if self.game.render:
+                    self.game.renderer.erase(pg.Rect(powerRect.topleft, self.powerImage.get_size()), self.draw_over)
+        return hit
 
     def check_hit(self):
-        for i in range(len(self.game.bricks)):
-            pg.sprite.spritecollide(self.game.bricks[i], self.nodes, True)
-        if pg.sprite.spritecollide(self.game.player, self.nodes, True):
+        if self.eat(self.game.player.rect):
             if self.game.mainClock.get_time() % 2 == 0:
                 self.game.audio.play_sound(0)
             self.game.score += 10
-        if pg.sprite.spritecollide(self.game.player, self.powerNodes, True):
+        if self.eat_power(self.game.player.rect):
             print('POWER PELLET!')
             self.game.bluemode = 1
             self.game.blinky.startF, self.game.blinky.endF = 0, 1
@@ -115,57 +122,63 @@ class Grid:
             self.game.blinky.currentFrame, self.game.pinky.currentFrame, self.game.inky.currentFrame, \
             self.game.clyde.currentFrame = 0, 0, 0, 0
             self.game.score += 50
-        if len(self.nodes) == 0:
+        if self.remaining == 0:
             self.game.level += 1
             Enemy.SPEED += 1
             self.reset_grid()
 
     def reset_grid(self):
-        for row in range(14, 121, 3):
-            for col in range(6, 50 * 2, 3):
-                self.create_node(n=col, row=row)
-        self.create_powerNode(n=5, row=19)
-        self.create_powerNode(n=98, row=19)
-        self.create_powerNode(n=5, row=94)
-        self.create_powerNode(n=98, row=94)
+        self.pellets[:] = self.layout
+        self.remaining = self.pellets.count(1)
+        self.power[:] = bytearray(b'\x01') * len(self.power)
+        self.repaint = True
+
+    def draw(self, surface):
+        surface.blits(zip(repeat(self.image), compress(self.positions, self.pellets)), doreturn=False)
+        surface.blits(zip(repeat(self.powerImage), compress(self.powerRects, self.power)), doreturn=False)
+
+    def draw_over(self, surface, rect):
+        # redraw the pellets still on the board that overlap rect (a power pellet's image overlaps its lattice
+        # neighbours, so erasing either one clips the other)
+        row0, row1, col0, col1 = self.tile_span(rect)
+        pellets, cols = self.pellets, self.lattice.cols
+        for row in range(row0, row1 + 1):
+            base = row * cols
+            for i in range(base + col0, base + col1 + 1):
+                if pellets[i]:
+                    surface.blit(self.image, self.positions[i])
+        for i, pos in enumerate(self.powerRects):
+            if self.power[i] and rect.colliderect(pg.Rect(pos.topleft, self.powerImage.get_size())):
+                surface.blit(self.powerImage, pos)
 
     def update(self):
         self.check_hit()
-        self.nodes.update()
-        self.powerNodes.update()
 
 
 # -------------------------------------------------------------------------------------
-class Player:
+class Player(Entity):
+    KIND = EntityStore.PLAYER
     SPEED = 6
-
-    def __init__(self, rect, velocity=Vector()):
-        self.pacAnimation = ['images/pac0.png', 'images/pac1.png', 'images/pac2.png']
-        self.currentFrame, self.currentAngle, self.animationDirection = 0, 0, 0
-        self.rect = rect
-        self.velocity = velocity
+    ANGLES = (0, 180, -90, 90)
+    PAC_ANIMATION = ['images/pac0.png', 'images/pac1.png', 'images/pac2.png']
+    DEATH_ANIMATION = ['images/death0.png', 'images/death1.png', 'images/death2.png', 'images/death3.png',
+                       'images/death4.png']
+
+    def __init__(self, rect, velocity=Vector(), store=None):
+        super().__init__(rect, velocity, store)
+        self.pacAnimation = Player.PAC_ANIMATION
+        self.currentAngle = 0
         self.player = pg.Rect(300, 100, 25, 25)
         self.lives = 3
         self.death = 0
-        self.image = pg.transform.rotozoom(pg.image.load(self.pacAnimation[self.currentFrame]),
-                                           self.currentAngle, 0.06)
+        self.image = frames.get(self.pacAnimation[self.currentFrame], self.currentAngle)
+        self.drawnRect = pg.Rect(self.rect.topleft, (0, 0))
 
     def __repr__(self):
         return "Player(rect={},velocity={})".format(self.rect, self.velocity)
 
     def change_frame(self):
-        if self.velocity == Vector():
-            return
-        if self.animationDirection == 0:
-            if self.currentFrame < len(self.pacAnimation) - 1:
-                self.currentFrame += 1
-            else:
-                self.animationDirection = 1
-        else:
-            if self.currentFrame > 0:
-                self.currentFrame -= 1
-            else:
-                self.animationDirection = 0
+        self.store.bounce((self.id,), len(self.pacAnimation) - 1)
 
     def limit_to_screen(self, game):
         self.rect.top = max(73, min(game.WINDOW_HEIGHT - self.rect.height - 80, self.rect.top))
@@ -177,33 +190,31 @@ class Player:
             self.rect.left = -30
 
     def move_ip(self, game):
-        if self.velocity == Vector():
+        vx, vy = self.store.vx[self.id], self.store.vy[self.id]
+        if vx == 0 and vy == 0:
             return
-        self.rect.move_ip(self.velocity.x, self.velocity.y)
+        self.rect.move_ip(vx, vy)
         self.limit_to_screen(game)
 
     def move(self, game):
-        if self.velocity == Vector():
+        vx, vy = self.store.vx[self.id], self.store.vy[self.id]
+        if vx == 0 and vy == 0:
             return
 
-        tempX = self.velocity.x
-        tempY = self.velocity.y
-
         if self.death == 0:
             if not self.check_collisions(game):
-                self.rect.left += self.velocity.x
-                self.rect.top += self.velocity.y
+                self.rect.left += vx
+                self.rect.top += vy
             if self.check_collisions(game):
-                self.rect.left -= self.velocity.x
-                self.rect.top -= self.velocity.y
+                self.rect.left -= vx
+                self.rect.top -= vy
 
-        if tempX != 0 or tempY != 0:
-            self.change_frame()
-        if self.velocity.x > 0:
+        self.change_frame()
+        if vx > 0:
             self.currentAngle = 0
-        elif self.velocity.x < 0:
+        elif vx < 0:
             self.currentAngle = 180
-        elif self.velocity.y > 0:
+        elif vy > 0:
             self.currentAngle = -90
         else:
             self.currentAngle = 90
@@ -215,51 +226,33 @@ class Player:
             if self.rect.colliderect(game.blinky.rect) or self.rect.colliderect(game.pinky.rect) or \
                     self.rect.colliderect(game.inky.rect) or self.rect.colliderect(game.clyde.rect):
                 if game.bluemode == 0:
-                    self.pacAnimation = ['images/death0.png', 'images/death1.png', 'images/death2.png',
-                                         'images/death3.png', 'images/death4.png']
+                    self.pacAnimation = Player.DEATH_ANIMATION
                     self.currentFrame, self.death = 0, 1
                 else:
                     game.score += 200
-                    if self.rect.colliderect(game.blinky.rect):
-                        game.blinky.rect.left = 259
-                        game.blinky.rect.top = 250
-                    if self.rect.colliderect(game.pinky.rect):
-                        game.pinky.rect.left = 259
-                        game.pinky.rect.top = 305
-                    if self.rect.colliderect(game.inky.rect):
-                        game.inky.rect.left = 230
-                        game.inky.rect.top = 305
-                    if self.rect.colliderect(game.clyde.rect):
-                        game.clyde.rect.left = 259
-                        game.clyde.rect.top = 305
+                    game.place([name for name in Game.GHOST_NAMES
+                                if self.rect.colliderect(getattr(game, name).rect)])
                     game.bluemode = 0
 
         if self.currentFrame == 4:
-            pg.mixer.music.load(game.death_src)
-            pg.mixer.music.play(1, 0.0)
+            # the death music plays while the loop keeps running; Game.advance() calls respawn() when it ends
+            game.enter(Game.DYING, game.death_src)
+
+    def respawn(self, game):
+        game.place()
+        self.lives -= 1
+        over = self.lives == 0
+        if over:
+            game.surface.blit(game.gOver0, game.gOver0Rect)
+        self.pacAnimation = Player.PAC_ANIMATION
+        self.currentFrame, self.animationDirection, self.death, self.velocity = 0, 0, 0, Vector()
+        game.state = Game.PLAYING
+        game.renderer.invalidate()
+        game.update()
+
+        if not over:
             # can't move until intro music stops
-            while pg.mixer.music.get_busy():
-                time.sleep(0.02)
-
-            self.rect.left, self.rect.top = 259, 363
-            game.blinky.rect.left, game.blinky.rect.top = 259, 250
-            game.pinky.rect.left, game.pinky.rect.top = 259, 305
-            game.inky.rect.left, game.inky.rect.top = 230, 305
-            game.clyde.rect.left, game.clyde.rect.top = 285, 305
-            self.lives -= 1
-            if self.lives == 0:
-                game.surface.blit(game.gOver0, game.gOver0Rect)
-            self.pacAnimation = ['images/pac0.png', 'images/pac1.png', 'images/pac2.png']
-            self.currentFrame, self.death, self.velocity = 0, 0, Vector()
-            game.update()
-
-            if self.lives > 0:
-                pg.mixer.music.load(game.intro_src)
-                pg.mixer.music.play(1, 0.0)
-                # can't move until intro music stops
-                while pg.mixer.music.get_busy():
-                    time.sleep(0.02)
-            time.sleep(0.02)
+            game.enter(Game.INTRO, game.intro_src)
 
     def check_collisions(self, game):
         if game.bluePortal.active == 1 and game.oranPortal.active == 1:
@@ -273,15 +266,13 @@ class Player:
                 game.player.rect.left, game.player.rect.top = game.bluePortal.rect.left, game.bluePortal.rect.top
                 game.bluePortal.remove_portal()
                 game.oranPortal.remove_portal(400)
-        for j in range(len(game.walls)):
-            if self.rect.colliderect(game.walls[j]):
-                return True
-        return False
+        return game.wallIndex.collide(self.rect)
 
     def draw(self, game):
-        self.image = pg.transform.rotozoom(pg.image.load(self.pacAnimation[self.currentFrame]),
-                                           self.currentAngle, 0.06)
-        game.surface.blit(self.image, self.rect)
+        if not game.render:
+            return
+        self.image = frames.get(self.pacAnimation[self.store.frame[self.id]], self.currentAngle)
+        self.drawnRect = game.surface.blit(self.image, self.rect)
 
     def update(self, game):
         self.check_ghosts(game=game)
@@ -291,36 +282,28 @@ class Player:
 
 
 # -------------------------------------------------------------------------------------
-class Enemy:
+class Enemy(Entity):
+    KIND = EntityStore.ENEMY
     SPEED = 6
 
-    def __init__(self, rect, velocity=Vector()):
+    def __init__(self, rect, velocity=Vector(), store=None):
+        super().__init__(rect, velocity, store)
         self.enemyAnimation = ['images/blinky0.png', 'images/blinky1.png', 'images/blinky2.png', 'images/blinky3.png',
                                'images/blinky4.png', 'images/blinky5.png', 'images/blinky6.png', 'images/blinky7.png',
                                'images/run0.png', 'images/run1.png']
-        self.currentFrame, self.animationDirection, self.portalPower = 0, 0, 0
-        self.startF, self.endF = 0, 1  # len(self.enemyAnimation) - 1
-        self.rect = rect
-        self.velocity = velocity
+        self.portalPower = 0
         self.enemy = pg.Rect(300, 100, 50, 50)
-        self.image = pg.transform.rotozoom(pg.image.load(self.enemyAnimation[self.currentFrame]), 0, 0.06)
+        self.image = frames.get(self.enemyAnimation[self.currentFrame])
+        self.drawnRect = pg.Rect(self.rect.topleft, (0, 0))
 
     def __repr__(self):
         return "Enemy(rect={},velocity={})".format(self.rect, self.velocity)
 
     def change_frame(self):
-        if self.velocity == Vector():
-            return
-        if self.startF <= self.currentFrame < self.endF:
-            self.currentFrame += 1
-        else:
-            self.currentFrame = self.startF
+        self.store.cycle((self.id,))
 
     def change_menu_frame(self):
-        if self.startF <= self.currentFrame < self.endF:
-            self.currentFrame += 1
-        else:
-            self.currentFrame = self.startF
+        self.store.cycle((self.id,), always=True)
 
     def limit_to_screen(self, game):
         self.rect.top = max(73, min(game.WINDOW_HEIGHT - self.rect.height - 55, self.rect.top))
@@ -330,36 +313,35 @@ class Enemy:
             self.rect.left = max(-300, min(game.WINDOW_WIDTH - self.rect.width + 48, self.rect.left))
 
     def move(self, game):
-        if self.velocity == Vector():
+        store, i = self.store, self.id
+        vx, vy = store.vx[i], store.vy[i]
+        if vx == 0 and vy == 0:
             return
         if game.level >= 3:
             self.portalPower = 1
         if game.m == 1:
-            self.rect.left += self.velocity.x
-            self.rect.top += self.velocity.y
-            tempX = self.velocity.x
-            tempY = self.velocity.y
-            if tempX != 0 or tempY != 0:
-                self.change_frame()
-        else:
+            self.rect.left += vx
+            self.rect.top += vy
             self.change_frame()
+        else:
+            # in play, Game.update steps every ghost's animation in one pass before moving them
             if not self.check_collisions(game):
-                self.rect.left += self.velocity.x
-                self.rect.top += self.velocity.y
+                self.rect.left += vx
+                self.rect.top += vy
             if self.check_collisions(game):
-                self.rect.left -= self.velocity.x
-                self.rect.top -= self.velocity.y
+                self.rect.left -= vx
+                self.rect.top -= vy
             if game.bluemode == 0:
-                if self.velocity.x > 0:
-                    self.startF, self.endF = 2, 3
-                elif self.velocity.x < 0:
-                    self.startF, self.endF = 0, 1
-                elif self.velocity.y > 0:
-                    self.startF, self.endF = 4, 5
+                if vx > 0:
+                    store.startF[i], store.endF[i] = 2, 3
+                elif vx < 0:
+                    store.startF[i], store.endF[i] = 0, 1
+                elif vy > 0:
+                    store.startF[i], store.endF[i] = 4, 5
                 else:
-                    self.startF, self.endF = 6, 7
+                    store.startF[i], store.endF[i] = 6, 7
             else:
-                self.startF, self.endF = 8, 9
+                store.startF[i], store.endF[i] = 8, 9
         self.limit_to_screen(game)
 
     def check_collisions(self, game):
@@ -375,14 +357,13 @@ class Enemy:
                 game.bluePortal.remove_portal()
                 game.oranPortal.remove_portal(400)
 
-        for j in range(len(game.gWalls)):
-            if self.rect.colliderect(game.gWalls[j]):
-                return True
-        return False
+        return game.gWallIndex.collide(self.rect)
 
     def draw(self, game):
-        self.image = pg.transform.rotozoom(pg.image.load(self.enemyAnimation[self.currentFrame]), 0, 0.06)
-        game.surface.blit(self.image, self.rect)
+        if not game.render:
+            return
+        self.image = frames.get(self.enemyAnimation[self.store.frame[self.id]])
+        self.drawnRect = game.surface.blit(self.image, self.rect)
 
     def update(self, game):
         self.check_collisions(game=game)
@@ -391,16 +372,17 @@ class Enemy:
 
 
 # -------------------------------------------------------------------------------------
-class Portal:
+class Portal(Entity):
+    KIND = EntityStore.PORTAL
     SPEED = 30
 
-    def __init__(self, rect, velocity=Vector()):
+    def __init__(self, rect, velocity=Vector(), store=None):
+        super().__init__(rect, velocity, store)
         self.portalAnimation = ['images/bluePortal.png', 'images/animatePortal.png']
-        self.currentFrame, self.active = 0, 0
-        self.startF, self.endF = 0, 1  # len(self.enemyAnimation) - 1
-        self.rect = rect
-        self.velocity = velocity
-        self.image = pg.transform.rotozoom(pg.image.load(self.portalAnimation[self.currentFrame]), 0, 0.06)
+        self.active = 0
+        self.travel = None  # pixels left to the landing point while in flight
+        self.image = frames.get(self.portalAnimation[self.currentFrame])
+        self.drawnRect = pg.Rect(self.rect.topleft, (0, 0))
 
     def __repr__(self):
         return "Portal(rect={},velocity={})".format(self.rect, self.velocity)
@@ -409,71 +391,77 @@ class Portal:
         self.active = 0
         pX, pY = game.player.rect.centerx, game.player.rect.centery
         if game.player.currentAngle == 0:
-            cX, cY = 10, -10
-            self.velocity = Portal.SPEED * Vector(1, 0)
+            cX, cY, dX, dY = 10, -10, 1, 0
         elif game.player.currentAngle == 180:
-            cX, cY = -35, -10
-            self.velocity = Portal.SPEED * Vector(-1, 0)
+            cX, cY, dX, dY = -35, -10, -1, 0
         elif game.player.currentAngle == -90:
-            cX, cY = -10, 10
-            self.velocity = Portal.SPEED * Vector(0, 1)
+            cX, cY, dX, dY = -10, 10, 0, 1
         else:
-            cX, cY = -10, -35
-            self.velocity = Portal.SPEED * Vector(0, -1)
+            cX, cY, dX, dY = -10, -35, 0, -1
+        self.store.vx[self.id], self.store.vy[self.id] = Portal.SPEED * dX, Portal.SPEED * dY
         self.rect.left, self.rect.top = pX + cX, pY + cY
+        # the landing point is found now, with one cast up to the first wall or the edge of the playfield;
+        # move() only animates the flight there
+        left, right, top, bottom = self.limits(game)
+        if dX:
+            reach = right - self.rect.left if dX > 0 else self.rect.left - left
+        else:
+            reach = bottom - self.rect.top if dY > 0 else self.rect.top - top
+        self.travel, _ = game.wallIndex.cast(self.rect, dX, dY, max(0, reach))
 
     def remove_portal(self, x=350, y=660):
         self.active = 0
+        self.travel = None
         self.rect.left, self.rect.top = x, y
 
     def change_frame(self):
-        if self.startF <= self.currentFrame < self.endF:
-            self.currentFrame += 1
-        else:
-            self.currentFrame = self.startF
+        self.store.cycle((self.id,), always=True)
+
+    def limits(self, game):
+        # (left, right, top, bottom) bounds of the portal's top-left corner
+        left = -28 if game.m == 0 else -300
+        return left, game.WINDOW_WIDTH - self.rect.width + 48, 73, game.WINDOW_HEIGHT - self.rect.height - 55
 
     def limit_to_screen(self, game):
-        self.rect.top = max(73, min(game.WINDOW_HEIGHT - self.rect.height - 55, self.rect.top))
-        if game.m == 0:
-            self.rect.left = max(-28, min(game.WINDOW_WIDTH - self.rect.width + 48, self.rect.left))
-        else:
-            self.rect.left = max(-300, min(game.WINDOW_WIDTH - self.rect.width + 48, self.rect.left))
+        left, right, top, bottom = self.limits(game)
+        self.rect.top = max(top, min(bottom, self.rect.top))
+        self.rect.left = max(left, min(right, self.rect.left))
 
     def move(self, game):
-        self.change_frame()
-        if self.check_collisions(game):
-            self.velocity = Vector()
-            self.active = 1
-        if self.rect.top == 73 or self.rect.top == 663 and self.rect.left != 350 and self.rect.left != 400:
-            self.active = 1
-        if self.active == 0:
-            self.rect.left += self.velocity.x
-            self.rect.top += self.velocity.y
+        # the animation frame is stepped for both portals at once by Game.update
+        if self.travel is not None:
+            store, i = self.store, self.id
+            step = min(Portal.SPEED, self.travel) if Portal.SPEED > 0 else self.travel  # SPEED 0: no flight
+            self.rect.left += step * ((store.vx[i] > 0) - (store.vx[i] < 0))
+            self.rect.top += step * ((store.vy[i] > 0) - (store.vy[i] < 0))
+            self.travel -= step
+            if self.travel == 0:
+                store.vx[i], store.vy[i] = 0, 0
+                self.active, self.travel = 1, None
         self.limit_to_screen(game)
 
-    def check_collisions(self, game):
-        for j in range(len(game.walls)):
-            if self.rect.colliderect(game.walls[j]):
-                return True
-        return False
-
     def draw(self, game):
-        self.image = pg.transform.rotozoom(pg.image.load(self.portalAnimation[self.currentFrame]), 0, 0.06)
-        game.surface.blit(self.image, self.rect)
+        if not game.render:
+            return
+        self.image = frames.get(self.portalAnimation[self.store.frame[self.id]])
+        self.drawnRect = game.surface.blit(self.image, self.rect)
 
     def update(self, game):
-        self.check_collisions(game=game)
         self.move(game=game)
         self.draw(game=game)
 
 
+# speeds a new game starts at; level-ups raise Enemy.SPEED, and Game.reset() puts them back
+SPEEDS = (Player.SPEED, Enemy.SPEED, Portal.SPEED)
+
+
 # -------------------------------------------------------------------------------------
 class Audio:  # sound(s) and background music
     def __init__(self, sounds, playing):
         self.sounds = {}
         for sound in sounds:
             for k, v in sound.items():
-                self.sounds[k] = pg.mixer.Sound(v)
+                self.sounds[k] = assets.sound(v)
 
         self.playing = playing
 
@@ -491,27 +479,80 @@ class Audio:  # sound(s) and background music
         self.play_sound(game.GAME_OVER)
 
 
+# -------------------------------------------------------------------------------------
+class SimClock:
+    # Stands in for pg.time.Clock when frames are stepped instead of waited for
+    def __init__(self, step):
+        self.step = step
+        self.ticks = 0
+
+    def tick(self, framerate=0):
+        self.ticks += self.step
+        return self.step
+
+    def get_time(self):
+        return self.step
+
+    def get_rawtime(self):
+        return self.step
+
+    def get_fps(self):
+        return 1000.0 / self.step
+
+
 # -------------------------------------------------------------------------------------
 class Game:
-    def __init__(self, title):
+    SIM_STEP = 20  # ms of game time per headless frame, roughly what play() paces itself to
+    # INTRO and DYING last as long as their music; the loop keeps drawing and handling input meanwhile
+    INTRO, PLAYING, DYING = 'intro', 'playing', 'dying'
+    # keys that change the game; pressed while music holds the game, they wait for the first frame after it
+    PLAY_KEYS = (K_LEFT, K_a, K_RIGHT, K_d, K_UP, K_w, K_DOWN, K_s, K_c, K_v)
+    # Scenes run one frame at a time from run(); each names its enter/frame/exit methods
+    MENU_SCENE, SCORES_SCENE, PLAY_SCENE, GAME_OVER_SCENE = 'menu', 'highscores', 'play', 'game over'
+    SCENES = {MENU_SCENE: ('menu_enter', 'menu_frame', 'menu_exit'),
+              SCORES_SCENE: ('scores_enter', 'scores_frame', 'scores_exit'),
+              PLAY_SCENE: ('play_enter', 'play_frame', None),
+              GAME_OVER_SCENE: (None, 'game_over_frame', None)}
+    MAZE = 'mazes/classic.json'
+    GHOST_NAMES = ('blinky', 'pinky', 'inky', 'clyde')
+
+    def __init__(self, title, headless=False, maze=MAZE):
+        # headless runs on SDL's dummy drivers, steps a simulated clock and never sleeps or waits on audio
+        self.headless, self.render = headless, not headless
+        if headless:
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+            os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
         pg.init()
-        logo = pg.image.load('images/pac2.png')
+        # sprites, sounds and fonts come from assets.bundle where it is current (see assets.py)
+        assets.open()
+        frames.load = assets.source
+        frames.frames.update(assets.frames())
+        logo = assets.image('images/pac2.png')
         pg.display.set_icon(logo)
         self.WINDOW_WIDTH, self.WINDOW_HEIGHT = 550, 700
-        self.bitFont = pg.font.Font('fonts/8-Bit Madness.ttf', 28)
+        self.bitFont = assets.font('fonts/8-Bit Madness.ttf', 28)
+        self.smallFont = assets.font('fonts/8-Bit Madness.ttf', 20)
+        # F3 shows per-stage frame timings, F4 writes them to profile.json
+        self.profiler = Profiler()
+        # walls, pellet lattice, spawn points and the ghost graph come from a level file (see maze.py)
+        self.maze = Maze(maze)
 
         self.m, self.h, self.bluemode, self.gameOver = 0, 0, 0, 0
-        self.mAnimate = Enemy(pg.Rect(self.WINDOW_WIDTH, 363, 50, 50), Vector())
+        # every actor's state lives in one column store (see entities.py)
+        self.entities = EntityStore()
+        self.mAnimate = Enemy(pg.Rect(self.WINDOW_WIDTH, 363, 50, 50), Vector(), self.entities)
         self.mAnimate.enemyAnimation = ['images/menu0.png', 'images/menu1.png', 'images/menu2.png', 'images/menu3.png',
                                         'images/menu4.png', 'images/menu5.png', 'images/menu6.png']
 
         # Pac-Man and Ghosts
-        self.player = Player(pg.Rect(259, 363, 25, 25), Vector())
-        self.blinky = Enemy(pg.Rect(259, 250, 25, 25), Vector())
-        self.pinky = Enemy(pg.Rect(259, 305, 25, 25), Vector())
-        self.inky = Enemy(pg.Rect(230, 305, 25, 25), Vector())
-        self.clyde = Enemy(pg.Rect(285, 305, 25, 25), Vector())
-        self.bCount, self.iCount, self.pCount, self.cCount = 0, 0, 0, 0
+        spawns = self.maze.spawns
+        self.player = Player(pg.Rect(spawns['player'], (25, 25)), Vector(), self.entities)
+        self.blinky = Enemy(pg.Rect(spawns['blinky'], (25, 25)), Vector(), self.entities)
+        self.pinky = Enemy(pg.Rect(spawns['pinky'], (25, 25)), Vector(), self.entities)
+        self.inky = Enemy(pg.Rect(spawns['inky'], (25, 25)), Vector(), self.entities)
+        self.clyde = Enemy(pg.Rect(spawns['clyde'], (25, 25)), Vector(), self.entities)
+        self.ghosts = (self.blinky, self.pinky, self.inky, self.clyde)
+        self.ghostIds = tuple(ghost.id for ghost in self.ghosts)
         self.pinky.enemyAnimation = ['images/pinky0.png', 'images/pinky1.png', 'images/pinky2.png', 'images/pinky3.png',
                                      'images/pinky4.png', 'images/pinky5.png', 'images/pinky6.png', 'images/pinky7.png',
                                      'images/run0.png', 'images/run1.png']
@@ -533,124 +574,55 @@ class Game:
                    self.GAME_OVER: 'sounds/game_over.ogg',
                    self.PORTAL_SOUND: 'sounds/makePortal.ogg',
                    self.PORTAL_CLOSE: 'sounds/closePortal.ogg'}]
-        self.audio = Audio(sounds=sounds, playing=True)
-
-        # Static Bricks (Player/Node)
-        b1 = Player(pg.Rect(0, 40, 29, 260))
-        b2 = Player(pg.Rect(0, 341, 29, 319))
-        b3 = Player(pg.Rect(self.WINDOW_WIDTH - 29, 40, 29, 260))
-        b4 = Player(pg.Rect(self.WINDOW_WIDTH - 29, 341, 29, 319))
-        b5 = Player(pg.Rect(58, 100, 60, 40))
-        b6 = Player(pg.Rect(140, 100, 100, 40))
-        b7 = Player(pg.Rect(self.WINDOW_WIDTH - 240, 100, 100, 40))
-        b8 = Player(pg.Rect(self.WINDOW_WIDTH - 118, 100, 60, 40))
-        b9 = Player(pg.Rect(58, 155, 60, 40))
-        b10 = Player(pg.Rect(self.WINDOW_WIDTH - 118, 155, 60, 40))
-        b11 = Player(pg.Rect(58, self.WINDOW_HEIGHT - 140, 180, 40))
-        b12 = Player(pg.Rect(self.WINDOW_WIDTH - 240, self.WINDOW_HEIGHT - 140, 190, 40))
-        b13 = Player(pg.Rect(140, 155, 40, 160))
-        b14 = Player(pg.Rect(self.WINDOW_WIDTH - 180, 155, 40, 160))
-        b15 = Player(pg.Rect(self.WINDOW_WIDTH / 2 - 12, 80, 30, 60))
-        b16 = Player(pg.Rect(self.WINDOW_WIDTH / 2 - 70, 155, 140, 40))
-        b17 = Player(pg.Rect(0, 222, 120, 85))
-        b18 = Player(pg.Rect(150, 220, 90, 30))
-        b19 = Player(pg.Rect(270, 200, 20, 50))
-        b20 = Player(pg.Rect(310, 220, 90, 30))
-        b21 = Player(pg.Rect(430, 222, 120, 85))
-        b22 = Player(pg.Rect(200, 280, 150, 85))
-        b23 = Player(pg.Rect(0, 330, 120, 85))
-        b24 = Player(pg.Rect(150, 330, 30, 85))
-        b25 = Player(pg.Rect(370, 330, 40, 85))
-        b26 = Player(pg.Rect(430, 330, 120, 85))
-        b27 = Player(pg.Rect(210, 390, 140, 30))
-        b28 = Player(pg.Rect(60, 440, 60, 40))
-        b29 = Player(pg.Rect(430, 440, 70, 40))
-        b30 = Player(pg.Rect(150, 440, 90, 40))
-        b31 = Player(pg.Rect(315, 445, 90, 40))
-        b32 = Player(pg.Rect(260, 430, 30, 50))
-        b33 = Player(pg.Rect(90, 470, 30, 70))
-        b34 = Player(pg.Rect(430, 470, 40, 70))
-        b35 = Player(pg.Rect(30, 500, 30, 40))
-        b36 = Player(pg.Rect(490, 500, 30, 40))
-        b37 = Player(pg.Rect(140, 500, 40, 50))
-        b38 = Player(pg.Rect(370, 500, 40, 50))
-        b39 = Player(pg.Rect(210, 500, 140, 40))
-        b40 = Player(pg.Rect(260, 530, 30, 70))
-        self.bricks = [b1, b2, b3, b4, b5, b6, b7, b8, b9, b10, b11, b12, b13, b14, b15, b16, b17, b18, b19, b20, b21,
-                       b22, b23, b24, b25, b26, b27, b28, b29, b30, b31, b32, b33, b34, b35, b36, b37, b38, b39, b40]
-
-        # Static Walls (Player/Wall)
-        w1 = Player(pg.Rect(-30, 40, 50, 260))
-        w2 = Player(pg.Rect(-30, 341, 50, 319))
-        w3 = Player(pg.Rect(self.WINDOW_WIDTH - 29, 40, 60, 260))
-        w4 = Player(pg.Rect(self.WINDOW_WIDTH - 29, 341, 60, 319))
-        w5 = Player(pg.Rect(58, 100, 50, 25))
-        w6 = Player(pg.Rect(140, 100, 80, 25))
-        w7 = Player(pg.Rect(self.WINDOW_WIDTH - 230, 100, 80, 25))
-        w8 = Player(pg.Rect(self.WINDOW_WIDTH - 110, 100, 40, 25))
-        w9 = Player(pg.Rect(60, 165, 50, 20))
-        w10 = Player(pg.Rect(self.WINDOW_WIDTH - 110, 165, 40, 20))
-        w11 = Player(pg.Rect(60, self.WINDOW_HEIGHT - 130, 165, 25))
-        w12 = Player(pg.Rect(self.WINDOW_WIDTH - 230, self.WINDOW_HEIGHT - 140, 165, 25))
-        w13 = Player(pg.Rect(145, 165, 25, 130))
-        w14 = Player(pg.Rect(self.WINDOW_WIDTH - 170, 165, 20, 130))
-        w15 = Player(pg.Rect(self.WINDOW_WIDTH / 2 - 12, 80, 20, 40))
-        w16 = Player(pg.Rect(self.WINDOW_WIDTH / 2 - 70, 165, 130, 20))
-        w17 = Player(pg.Rect(0, 222, 105, 80))
-        w18 = Player(pg.Rect(150, 220, 70, 20))
-        w19 = Player(pg.Rect(270, 200, 10, 40))
-        w20 = Player(pg.Rect(320, 220, 60, 20))
-        w21 = Player(pg.Rect(430, 222, 120, 76))
-        w22 = Player(pg.Rect(200, 280, 140, 75))
-        w23 = Player(pg.Rect(0, 341, 105, 75))
-        w24 = Player(pg.Rect(150, 335, 20, 75))
-        w25 = Player(pg.Rect(380, 335, 20, 75))
-        w26 = Player(pg.Rect(440, 341, 120, 70))
-        w27 = Player(pg.Rect(210, 390, 130, 25))
-        w28 = Player(pg.Rect(60, 450, 50, 25))
-        w29 = Player(pg.Rect(435, 450, 50, 25))
-        w30 = Player(pg.Rect(150, 450, 70, 25))
-        w31 = Player(pg.Rect(315, 450, 70, 25))
-        w32 = Player(pg.Rect(260, 430, 20, 40))
-        w33 = Player(pg.Rect(90, 470, 20, 60))
-        w34 = Player(pg.Rect(435, 470, 20, 60))
-        w35 = Player(pg.Rect(30, 510, 20, 25))
-        w36 = Player(pg.Rect(495, 510, 20, 25))
-        w37 = Player(pg.Rect(150, 510, 15, 50))
-        w38 = Player(pg.Rect(380, 510, 15, 50))
-        w39 = Player(pg.Rect(210, 510, 130, 20))
-        w40 = Player(pg.Rect(260, 530, 20, 50))
-        self.walls = [w1, w2, w3, w4, w5, w6, w7, w8, w9, w10, w11, w12, w13, w14, w15, w16, w17, w18, w19, w20, w21,
-                      w22, w23, w24, w25, w26, w27, w28, w29, w30, w31, w32, w33, w34, w35, w36, w37, w38, w39, w40]
-
-        # Static Walls (Ghosts/Walls)
-        self.gWalls = self.walls
-        self.gWalls[21] = Player(pg.Rect(320, 280, 20, 75))
-        self.gWalls.append(Player(pg.Rect(200, 280 + 55, 140, 20)))
-        self.gWalls.append(Player(pg.Rect(200, 280, 20, 75)))
+        self.audio = Audio(sounds=sounds, playing=not headless)
+
+        # Static bricks (drawn), walls (Pac-Man) and ghost walls, with their prebuilt wall indexes
+        self.bricks = [Wall(rect) for rect in self.maze.bricks]
+        self.walls = [Wall(rect) for rect in self.maze.walls]
+        self.gWalls = self.walls if self.maze.ghostWalls is self.maze.walls else \
+            [Wall(rect) for rect in self.maze.ghostWalls]
+        self.wallIndex, self.gWallIndex = self.maze.wallIndex, self.maze.ghostWallIndex
+
+        # Ghost navigation graph over the ghost walls, with a scatter corner per ghost
+        self.navGrid = self.maze.navGrid
+        self.ghostAI = GhostAI(self.navGrid, {getattr(self, name): pos for name, pos in self.maze.scatter.items()},
+                               {getattr(self, name): field for name, field in self.maze.homeFields.items()})
 
         # Portals
-        self.bluePortal = Portal(pg.Rect(350, 660, 25, 25))
-        self.oranPortal = Portal(pg.Rect(350, 660, 25, 25))
+        self.bluePortal = Portal(pg.Rect(350, 660, 25, 25), Vector(), self.entities)
+        self.oranPortal = Portal(pg.Rect(350, 660, 25, 25), Vector(), self.entities)
+        self.portalIds = (self.bluePortal.id, self.oranPortal.id)
+        self.actors = (self.player, self.bluePortal, self.oranPortal) + self.ghosts  # draw order
         self.bluePortal.portalAnimation = ['images/bluePortal.png', 'images/animatePortal.png']
         self.oranPortal.portalAnimation = ['images/orangePortal.png', 'images/animatePortal.png']
 
-        self.score, self.level, self.topScores = 0, 0, []
-        # Fill topScores with values in textFile
-        f = open('highscores.txt', 'r')
-        f1 = f.readlines()
-        for s in f1:
-            self.topScores.append(int(s))
-        f.close()
-        self.topScores.sort(reverse=True)
+        # frames the bundle did not supply start decoding in the background while the rest is set up
+        animations = [(Player.PAC_ANIMATION + Player.DEATH_ANIMATION, Player.ANGLES)]
+        animations += [(actor.enemyAnimation, (0,)) for actor in (self.mAnimate,) + self.ghosts]
+        animations += [(portal.portalAnimation, (0,)) for portal in (self.bluePortal, self.oranPortal)]
+        assets.prefetch(dict.fromkeys(path for paths, angles in animations for path in frames.missing(paths, angles)))
+
+        self.score, self.level, self.lastScore = 0, 0, 0
+        self.scores = HighScores('highscores.txt')
 
         self.finished = False
+        self.state = Game.PLAYING
+        self.scene, self.nextScene = None, None
+        self.recorder = None  # replay.Recorder while a session is being recorded
+        self.held = []  # PLAY_KEYS events from frames spent waiting on music
+        self.spectators = None  # spectate.SpectatorServer while the game is being streamed
+        self.capture = None  # capture.FrameCapture while drawn frames are being saved
         self.BLACK = (0, 0, 0)
         self.WHITE = (255, 255, 255)
         self.BACKGROUND_COLOR = self.BLACK
         self.WALL_COLOR = (255, 0, 0)
         self.FPS = 60
 
+        self.text = TextCache(self.bitFont)
+        self.scoreLabel = Label(self.text, 'Score: ', (70, 25), self.WHITE, self.BLACK)
+        self.levelLabel = Label(self.text, 'Level: ', (500, 25), self.WHITE, self.BLACK)
+        self.livesLabel = Label(self.text, 'Lives: ', (70, 675), self.WHITE, self.BLACK)
+
         self.gOver0 = self.bitFont.render('Game Over... Play Again?', True, self.WHITE, self.BLACK)
         self.gOver0Rect = self.gOver0.get_rect()
         self.gOver0Rect.center = (275, 325)
@@ -659,9 +631,24 @@ class Game:
         self.surface = pg.display.set_mode((self.WINDOW_WIDTH, self.WINDOW_HEIGHT), 0, 32)
         self.grid = Grid(self)
 
-        self.bImage = pg.image.load('images/pacGrid.png')
-        self.mImage = pg.image.load('images/menu.png')
-        self.mainClock = pg.time.Clock()
+        self.bImage = assets.image('images/pacGrid.png')
+        self.mImage = assets.image('images/menu.png')
+
+        # Dirty-rect rendering: the maze is painted once and only what changes gets restored and pushed
+        base = pg.Surface((self.WINDOW_WIDTH, self.WINDOW_HEIGHT)).convert()
+        base.fill(self.BACKGROUND_COLOR)
+        base.blit(self.bImage, (0, 46))
+        self.renderer = DirtyRenderer(self.surface, base)
+        # the menu gets its own: menu art plus the buttons as background, the animation on top
+        self.menuRenderer = DirtyRenderer(self.surface, self.mImage.convert())
+        self.mainClock = SimClock(Game.SIM_STEP) if headless else pg.time.Clock()
+
+        # Decode and scale every animation frame up front so draw() is just a blit
+        for paths, angles in animations:
+            frames.preload(paths, angles)
+
+        # actor state as constructed, for reset()
+        self.initial = self.entities.snapshot()
 
     @staticmethod
     def wait_for_key_press():
@@ -685,6 +672,10 @@ class Game:
             k = event.key
             if k == K_m and e_type == KEYUP:
                 pg.mixer.music.stop()
+            elif k == K_F3 and e_type == KEYUP:
+                self.profiler.toggle_overlay(self)
+            elif k == K_F4 and e_type == KEYUP:
+                self.profiler.record(self, 'profile.json')
             elif k in x_z:
                 if e_type == KEYDOWN:
                     pass
@@ -710,24 +701,132 @@ class Game:
         elif e_type == QUIT or (e_type == KEYUP and event.key == K_ESCAPE):
             self.finished = True
 
-    def update(self):
-        self.surface.fill(self.BACKGROUND_COLOR)
-        self.surface.blit(self.bImage, (0, 46))
-
-        text = self.bitFont.render(f'Score: {self.score}', True, self.WHITE, self.BLACK)
-        textRect = text.get_rect()
-        textRect.center = (70, 25)
-        self.surface.blit(text, textRect)
+    def play_music(self, src):
+        if self.headless:
+            return
+        pg.mixer.music.load(src)
+        pg.mixer.music.play(1, 0.0)
 
-        text2 = self.bitFont.render(f'Level: {self.level}', True, self.WHITE, self.BLACK)
-        textRect2 = text2.get_rect()
-        textRect2.center = (500, 25)
-        self.surface.blit(text2, textRect2)
+    def place(self, names=('player',) + GHOST_NAMES):
+        # put Pac-Man and the ghosts (or just the named ones) back on the maze's spawn points
+        for name in names:
+            getattr(self, name).rect.topleft = self.maze.spawns[name]
+
+    def music_busy(self):
+        return not self.headless and pg.mixer.music.get_busy()
+
+    def enter(self, state, music=None):
+        # the state is left by advance() on the first frame its music is over (the next one when headless)
+        self.state = state
+        if music is not None:
+            self.play_music(music)
+
+    def advance(self):
+        # leave INTRO/DYING once their music has finished; True when this frame should run gameplay
+        if self.state != Game.PLAYING and not self.music_busy():
+            if self.state == Game.DYING:
+                # respawn() plays this frame itself and then starts the intro, or ends the game at zero lives
+                self.player.respawn(self)
+                return False
+            elif self.state == Game.INTRO:
+                self.state = Game.PLAYING
+        return self.state == Game.PLAYING
+
+    def pause(self, seconds):
+        if not self.headless:
+            time.sleep(seconds)
+
+    def handle_events(self, events):
+        # every gameplay frame's input goes through here, so a recorder sees exactly what the game saw
+        if self.recorder is not None:
+            self.recorder.record(events)
+        for event in events:
+            self.process_event_loop(event)
+
+    def step(self, events=()):
+        # advance exactly one frame; with headless=True this runs as fast as the game logic allows
+        self.play_frame(events)
+        self.mainClock.tick(self.FPS)
+
+    def reset(self, speeds=SPEEDS):
+        # start over as a newly constructed Game would, without reloading anything, so one instance can play
+        # many episodes. The speed class attributes go back to speeds (the defaults unless a sweep varies them).
+        Player.SPEED, Enemy.SPEED, Portal.SPEED = speeds
+        self.entities.restore(self.initial)
+        self.m, self.h, self.bluemode, self.gameOver = 0, 0, 0, 0
+        self.score, self.level, self.lastScore = 0, 0, 0
+        self.finished, self.state = False, Game.PLAYING
+        self.scene, self.nextScene = None, None
+        self.held = []
+        player = self.player
+        player.pacAnimation, player.currentAngle, player.lives, player.death = Player.PAC_ANIMATION, 0, 3, 0
+        for ghost in self.ghosts:
+            ghost.portalPower = 0
+        for portal in (self.bluePortal, self.oranPortal):
+            portal.active, portal.travel = 0, None
+        # an empty board: the first frame levels up to 1 and fills it, as it does for a new Game
+        grid = self.grid
+        grid.pellets[:], grid.power[:], grid.remaining = bytes(len(grid.pellets)), bytes(len(grid.power)), 0
+        grid.repaint = True
+        self.ghostAI.reset()
+        if self.headless:
+            self.mainClock = SimClock(Game.SIM_STEP)
+        self.renderer.invalidate()
+
+    def finish_frame(self):
+        # after each gameplay frame: stream it to spectators and hand the drawn window to the frame capture
+        if self.spectators is not None:
+            self.spectators.publish()
+        if self.capture is not None and self.render:
+            self.capture.grab()
+
+    def simulate(self, frames, render=False):
+        self.render = render
+        self.grid.repaint = True
+        count = 0
+        while count < frames and not self.finished:
+            self.step(pg.event.get())
+            count += 1
+        return count
+
+    def begin_frame(self):
+        if self.grid.repaint:
+            self.renderer.reset_background(self.grid.draw)
+            self.grid.repaint = False
+        self.renderer.begin()
+        self.draw_hud()
+
+    def draw_hud(self):
+        # HUD text is only re-laid out and re-blitted when its value changes (or the window was repainted)
+        for label, value in ((self.scoreLabel, self.score), (self.levelLabel, self.level),
+                             (self.livesLabel, self.player.lives)):
+            old = label.rect
+            if label.set(value) or self.renderer.full:
+                self.renderer.stamp(label.image, label.rect, old)
+
+    def end_frame(self):
+        if self.profiler.overlay:
+            self.profiler.draw(self.renderer, self.smallFont)
+        for actor in self.actors:
+            self.renderer.track(actor.drawnRect)
+        self.renderer.flush()
+
+    def hold(self):
+        # a frame while music plays: redraw everything where it stands, move nothing
+        if self.render:
+            self.begin_frame()
+            for actor in self.actors:
+                actor.draw(game=self)
+            self.end_frame()
 
-        text3 = self.bitFont.render(f'Lives: {self.player.lives}', True, self.WHITE, self.BLACK)
-        textRect3 = text3.get_rect()
-        textRect3.center = (70, 675)
-        self.surface.blit(text3, textRect3)
+    def update(self):
+        if not self.advance():
+            # the last respawn leaves the state PLAYING with the game already over: nothing left to draw
+            if self.state != Game.PLAYING:
+                self.hold()
+            return
+        if self.render:
+            self.begin_frame()
 
         # Test Rect
         # pg.draw.rect(self.surface, self.WALL_COLOR, (200, 280, 140, 75))
@@ -735,31 +834,34 @@ class Game:
         self.grid.update()
 
         self.player.update(game=self)
+        self.entities.cycle(self.portalIds, always=True)
         self.bluePortal.update(game=self)
         self.oranPortal.update(game=self)
         if self.player.lives == 0:
             self.gameOver = 1
             self.player.lives = 3
-            self.topScores.append(self.score)
+            self.lastScore = self.score
+            # a recording covers a single game
+            if self.recorder is not None:
+                self.recorder.close()
+                self.recorder = None
 
-            # add newest score to highscores.txt
-            f = open('highscores.txt', 'a')
-            f.write(f'\n{self.score}')
-            f.close()
+            # save the table when the score made it (simulated games don't touch the real file)
+            if self.scores.add(self.score) and not self.headless:
+                self.scores.save()
 
-            self.topScores.sort(reverse=True)
             self.score, self.level = 0, 1
             self.grid.reset_grid()
+            self.ghostAI.reset()
             # reset location of Pac-man and ghosts
-            self.player.rect.left, self.player.rect.top = 259, 363
-            self.blinky.rect.left, self.blinky.rect.top = 259, 250
-            self.pinky.rect.left, self.pinky.rect.top = 259, 305
-            self.inky.rect.left, self.inky.rect.top = 230, 305
-            self.clyde.rect.left, self.clyde.rect.top = 285, 305
+            self.place()
             self.surface.fill(self.BACKGROUND_COLOR)
             self.surface.blit(self.bImage, (0, 46))
             self.surface.blit(self.gOver0, self.gOver0Rect)
-            self.menu()
+            if self.headless:
+                self.finished = True
+            else:
+                self.change_scene(Game.GAME_OVER_SCENE)
 
         else:
             '''
@@ -771,246 +873,205 @@ class Game:
                 self.fruit.update()
             '''
 
-            # Randomized Ghost Movement
-            if self.mainClock.get_time() % random.randint(1, 40) == 0:
-                self.bCount = random.randint(1, 4)
-                if self.bCount == 1:
-                    self.blinky.velocity = Enemy.SPEED * Vector(1, 0)
-                elif self.bCount == 2:
-                    self.blinky.velocity = Enemy.SPEED * Vector(0, 1)
-                elif self.bCount == 3:
-                    self.blinky.velocity = Enemy.SPEED * Vector(-1, 0)
-                else:  # 4
-                    self.blinky.velocity = Enemy.SPEED * Vector(0, -1)
-            self.blinky.update(game=self)
-            if self.mainClock.get_time() % random.randint(1, 40) == 0:
-                self.pCount = random.randint(1, 4)
-                if self.pCount == 1:
-                    self.pinky.velocity = Enemy.SPEED * Vector(1, 0)
-                elif self.pCount == 2:
-                    self.pinky.velocity = Enemy.SPEED * Vector(0, 1)
-                elif self.pCount == 3:
-                    self.pinky.velocity = Enemy.SPEED * Vector(-1, 0)
-                else:  # 4
-                    self.pinky.velocity = Enemy.SPEED * Vector(0, -1)
-            self.pinky.update(game=self)
-            if self.mainClock.get_time() % random.randint(1, 40) == 0:
-                self.iCount = random.randint(1, 4)
-                if self.iCount == 1:
-                    self.inky.velocity = Enemy.SPEED * Vector(1, 0)
-                elif self.iCount == 2:
-                    self.inky.velocity = Enemy.SPEED * Vector(0, 1)
-                elif self.iCount == 3:
-                    self.inky.velocity = Enemy.SPEED * Vector(-1, 0)
-                else:  # 4
-                    self.inky.velocity = Enemy.SPEED * Vector(0, -1)
-            self.inky.update(game=self)
-            # Randomized Clyde Movement
-            # if current second are divisible by 3 or 7, actually move, else don't
-            # self.cCount = random number between 1-4
-            # if 1 move=left, 2=up, 3=right, 4=down
-            if self.mainClock.get_time() % random.randint(1, 40) == 0:
-                self.cCount = random.randint(1, 4)
-                if self.cCount == 1:
-                    self.clyde.velocity = Enemy.SPEED * Vector(1, 0)
-                elif self.cCount == 2:
-                    self.clyde.velocity = Enemy.SPEED * Vector(0, 1)
-                elif self.cCount == 3:
-                    self.clyde.velocity = Enemy.SPEED * Vector(-1, 0)
-                else:  # 4
-                    self.clyde.velocity = Enemy.SPEED * Vector(0, -1)
-            self.clyde.update(game=self)
-            pg.display.update()
-
-    def menu(self):
+            # Ghosts follow the shared flow field toward Pac-Man (their corners while scattering, away when blue)
+            self.ghostAI.track(self.player.rect)
+            store, frightened = self.entities, self.bluemode == 1
+            for ghost in self.ghosts:
+                store.vx[ghost.id], store.vy[ghost.id] = self.ghostAI.steer(ghost, Enemy.SPEED, frightened)
+            store.cycle(self.ghostIds)
+            for ghost in self.ghosts:
+                ghost.update(game=self)
+            self.ghostAI.tick()
+            if self.render:
+                self.end_frame()
+
+    def change_scene(self, scene):
+        # takes effect at the top of the next loop iteration, after the current frame has finished
+        self.nextScene = scene
+
+    def run(self, scene=MENU_SCENE):
+        # The one main loop. Scenes hand over through change_scene() instead of calling each other, so the
+        # stack stays flat however many games are played.
+        self.change_scene(scene)
+        while not self.finished:
+            if self.nextScene is not None:
+                leave = self.scene and Game.SCENES[self.scene][2]
+                if leave:
+                    getattr(self, leave)()
+                self.scene, self.nextScene = self.nextScene, None
+                enter = Game.SCENES[self.scene][0]
+                if enter:
+                    getattr(self, enter)()
+            getattr(self, Game.SCENES[self.scene][1])(pg.event.get())
+            self.pause(0.02)
+            self.mainClock.tick(self.FPS)
+        Game.terminate()
+
+    def menu_enter(self):
         self.m = 1  # menu is on
         # music
-        if not pg.mixer.music.get_busy():
+        if not self.headless and not pg.mixer.music.get_busy():
             pg.mixer.music.load('sounds/Arsenic1987_PacmanRemix.mp3')
             pg.mixer.music.play()
-        self.surface.blit(self.mImage, (0, 0))
         self.mAnimate.update(game=self)
 
-        # Make the Play button.
-        play_button = Button(self.surface, "Play")
-        play_button.rect.top += 200
-        play_button.prep_msg("Play")
-
-        # Make the HighScore button.
-        hScore_button = Button(self.surface, "Highscores")
-        hScore_button.rect.top += 250
-        hScore_button.prep_msg("Highscores")
-
-        pg.display.update()
-        play_button.draw_button()
-        hScore_button.draw_button()
+        # Make the Play and HighScore buttons; they are painted into the menu background once
+        self.playButton = Button(self.surface, "Play", 200)
+        self.hScoreButton = Button(self.surface, "Highscores", 250)
+        self.menuWidgets = Widgets(self.menuRenderer, (self.playButton, self.hScoreButton))
+        self.menuRenderer.reset_background(self.menuWidgets.paint)
 
+        # Blinky, Pinky, Inky, Clyde and the tagline all share one spot under the buttons
         blinkC, pinkC, inkyC, clydeC = (249, 0, 0), (249, 141, 224), (5, 249, 249), (249, 138, 13)
-        text0 = self.bitFont.render('Blinky', True, blinkC, (0, 0, 0))
-        text1 = self.bitFont.render('Pinky', True, pinkC, (0, 0, 0))
-        text2 = self.bitFont.render('Inky', True, inkyC, (0, 0, 0))
-        text3 = self.bitFont.render('Clyde', True, clydeC, (0, 0, 0))
-        text4 = self.bitFont.render('How High Can You Score?', True, (249, 241, 0), (0, 0, 0))
-        textRect0, textRect1, textRect2, textRect3, textRect4 \
-            = text0.get_rect(), text1.get_rect(), text2.get_rect(), text3.get_rect(), text4.get_rect()
-        textRect0.center, textRect1.center, textRect2.center, textRect3.center, textRect4.center \
-            = (275, 450), (275, 450), (275, 450), (275, 450), (275, 450)
-
-        # Wait for Keypress To Move To Next State
-        key_pressed = False
-        count = 0
-        temp = -1
-        itemp = 0
+        self.menuTexts = []
+        for msg, color in (('Blinky', blinkC), ('Pinky', pinkC), ('Inky', inkyC), ('Clyde', clydeC),
+                           ('How High Can You Score?', (249, 241, 0))):
+            text = self.text.render(msg, color, (0, 0, 0))
+            self.menuTexts.append((text, text.get_rect(center=(275, 450))))
 
-        blinky = self.blinky
-        pinky = self.pinky
-        inky = self.inky
-        clyde = self.clyde
+        self.menuCount, self.menuTemp, self.menuTick = 0, -1, 0
 
-        blinky.rect.left, blinky.rect.top = 260, 410
-        pinky.rect.left, pinky.rect.top = 260, 410
-        inky.rect.left, inky.rect.top = 260, 410
-        clyde.rect.left, clyde.rect.top = 260, 410
+        self.blinky.rect.left, self.blinky.rect.top = 260, 410
+        self.pinky.rect.left, self.pinky.rect.top = 260, 410
+        self.inky.rect.left, self.inky.rect.top = 260, 410
+        self.clyde.rect.left, self.clyde.rect.top = 260, 410
 
-        while not key_pressed:
-            itemp += 1
-            if count == 150:
-                temp *= -1
-                count = 0
-            count += 1
+    def menu_frame(self, events):
+        # one frame of the menu animation; returns True once Play is clicked
+        key_pressed = False
+        play_button, hScore_button = self.playButton, self.hScoreButton
+        renderer = self.menuRenderer
+        text4, textRect4 = self.menuTexts[4]
+        blinky, pinky, inky, clyde = self.blinky, self.pinky, self.inky, self.clyde
+
+        self.menuTick += 1
+        if self.menuCount == 150:
+            self.menuTemp *= -1
+            self.menuCount = 0
+        self.menuCount += 1
+        count, itemp = self.menuCount, self.menuTick
+
+        store, mId = self.entities, self.mAnimate.id
+        store.vx[mId], store.vy[mId] = Enemy.SPEED * self.menuTemp, 0
+        # only what was drawn last frame is restored; the menu art and buttons stay on screen
+        renderer.begin()
+        if itemp < 300:
+            if count < 50 and self.gameOver == 1:
+                renderer.blit(self.gOver0, self.gOver0Rect)
+            elif self.gameOver == 1:
+                self.gameOver = 0
+            if store.vx[mId] == -Enemy.SPEED and store.vy[mId] == 0:
+                self.mAnimate.rect.left = self.mAnimate.rect.left
+                self.mAnimate.startF, self.mAnimate.endF = 0, 2
+            else:
+                self.mAnimate.startF, self.mAnimate.endF = 3, len(self.mAnimate.enemyAnimation) - 1
+                renderer.blit(text4, textRect4)
+
+            self.mAnimate.update(game=self)
+            renderer.track(self.mAnimate.drawnRect)
+
+        # Individually Introduce
+        for start, end, ghost, (text, textRect) in ((300, 337, blinky, self.menuTexts[0]),
+                                                    (337, 375, pinky, self.menuTexts[1]),
+                                                    (375, 412, inky, self.menuTexts[2]),
+                                                    (412, 450, clyde, self.menuTexts[3])):
+            if start <= itemp <= end:
+                renderer.blit(text, textRect)
+                ghost.change_menu_frame()
+                ghost.update(self)
+                renderer.track(ghost.drawnRect)
+                break
+        else:
+            if itemp >= 450:
+                self.menuTick = 0
+                self.menuTemp *= -1
+
+        for e in events:
+            if e.type == QUIT or e.type == KEYDOWN and e.key == K_ESCAPE:
+                Game.terminate()
+            elif e.type == pg.MOUSEBUTTONDOWN:
+                clicked = self.menuWidgets.clicked(pg.mouse.get_pos())
+                if play_button in clicked:
+                    key_pressed = True
+                    self.change_scene(Game.PLAY_SCENE)
+                elif hScore_button in clicked:
+                    self.change_scene(Game.SCORES_SCENE)
+            else:
+                # buttons repaint themselves only when their hover state flips
+                self.menuWidgets.hover(pg.mouse.get_pos())
+        renderer.flush()
+        return key_pressed
 
-            self.mAnimate.velocity = Enemy.SPEED * Vector(1 * temp, 0)
-            self.surface.blit(self.mImage, (0, 0))
-            if itemp < 300:
-                if count < 50 and self.gameOver == 1:
-                    self.surface.blit(self.gOver0, self.gOver0Rect)
-                elif self.gameOver == 1:
-                    self.gameOver = 0
-                if self.mAnimate.velocity == Enemy.SPEED * Vector(-1, 0):
-                    self.mAnimate.rect.left = self.mAnimate.rect.left
-                    self.mAnimate.startF, self.mAnimate.endF = 0, 2
-                else:
-                    self.mAnimate.startF, self.mAnimate.endF = 3, len(self.mAnimate.enemyAnimation) - 1
-                    self.surface.blit(text4, textRect4)
-
-                self.mAnimate.update(game=self)
-
-            # Individually Introduce
-            if 300 <= itemp <= 337:
-                self.surface.blit(text0, textRect0)
-                blinky.change_menu_frame()
-                blinky.update(self)
-            elif 337 <= itemp <= 375:
-                self.surface.blit(text1, textRect1)
-                pinky.change_menu_frame()
-                pinky.update(self)
-            elif 375 <= itemp <= 412:
-                self.surface.blit(text2, textRect2)
-                inky.change_menu_frame()
-                inky.update(self)
-            elif 412 <= itemp <= 450:
-                self.surface.blit(text3, textRect3)
-                clyde.change_menu_frame()
-                clyde.update(self)
-            elif itemp >= 450:
-                itemp = 0
-                temp *= -1
-
-            play_button.draw_button()
-            hScore_button.draw_button()
-            pg.display.update()
-            for e in pg.event.get():
-                if e.type == QUIT or e.type == KEYDOWN and e.key == K_ESCAPE:
-                    Game.terminate()
-                elif e.type == pg.MOUSEBUTTONDOWN:
-                    mouse_x, mouse_y = pg.mouse.get_pos()
-                    play_clicked = play_button.rect.collidepoint(mouse_x, mouse_y)
-                    score_clicked = hScore_button.rect.collidepoint(mouse_x, mouse_y)
-                    if play_clicked:
-                        key_pressed = True
-                    if score_clicked:
-                        self.highScores()
-                else:
-                    mouse_x, mouse_y = pg.mouse.get_pos()
-                    play_hover = play_button.rect.collidepoint(mouse_x, mouse_y)
-                    score_hover = hScore_button.rect.collidepoint(mouse_x, mouse_y)
-                    if play_hover:
-                        play_button.text_color = (255, 255, 255)
-                        play_button.prep_msg("Play")
-                        play_button.draw_button()
-                    else:
-                        play_button.text_color = play_button.temp_color
-                        play_button.prep_msg("Play")
-                        play_button.draw_button()
-                    if score_hover:
-                        hScore_button.text_color = (255, 255, 255)
-                        hScore_button.prep_msg("Highscores")
-                        hScore_button.draw_button()
-                    else:
-                        hScore_button.text_color = hScore_button.temp_color
-                        hScore_button.prep_msg("Highscores")
-                        hScore_button.draw_button()
-            time.sleep(0.02)
+    def menu_exit(self):
         self.m = 0  # menu is off
         # reset ghosts
-        self.blinky.rect.left, self.blinky.rect.top = 259, 250
-        self.pinky.rect.left, self.pinky.rect.top = 259, 305
-        self.inky.rect.left, self.inky.rect.top = 230, 305
-        self.clyde.rect.left, self.clyde.rect.top = 285, 305
-        self.play()
+        self.place(Game.GHOST_NAMES)
 
-    def highScores(self):
+    def scores_enter(self):
         self.h = 1  # highscores is on
 
         self.surface.fill(self.BACKGROUND_COLOR)
-        text = self.bitFont.render('High Scores:', True, (249, 241, 0), (0, 0, 0))
-        text0 = self.bitFont.render(f'#1: {self.topScores[0]}', True, (249, 0, 0), (0, 0, 0))
-        text1 = self.bitFont.render(f'#2: {self.topScores[1]}', True, (249, 141, 224), (0, 0, 0))
-        text2 = self.bitFont.render(f'#3: {self.topScores[2]}', True, (5, 249, 249), (0, 0, 0))
-        text3 = self.bitFont.render(f'#4: {self.topScores[3]}', True, (249, 138, 13), (0, 0, 0))
-        text4 = self.bitFont.render(f'#5: {self.topScores[4]}', True, (249, 241, 0), (0, 0, 0))
-        text5 = self.bitFont.render('Hit Backspace To Go Back to Menu', True, (255, 255, 255), (0, 0, 0))
+        text = self.text.render('High Scores:', (249, 241, 0), (0, 0, 0))
+        top = self.scores.top() + ['---'] * 5  # fewer than five games played leaves blank rows
+        text0 = self.text.render(f'#1: {top[0]}', (249, 0, 0), (0, 0, 0))
+        text1 = self.text.render(f'#2: {top[1]}', (249, 141, 224), (0, 0, 0))
+        text2 = self.text.render(f'#3: {top[2]}', (5, 249, 249), (0, 0, 0))
+        text3 = self.text.render(f'#4: {top[3]}', (249, 138, 13), (0, 0, 0))
+        text4 = self.text.render(f'#5: {top[4]}', (249, 241, 0), (0, 0, 0))
+        text5 = self.text.render('Hit Backspace To Go Back to Menu', (255, 255, 255), (0, 0, 0))
         textRect, textRect0, textRect1, textRect2, textRect3, textRect4, textRect5 = \
             text.get_rect(), text0.get_rect(), text1.get_rect(), text2.get_rect(), \
             text3.get_rect(), text4.get_rect(), text5.get_rect()
         textRect.center, textRect0.center, textRect1.center, textRect2.center, textRect3.center, textRect4.center, \
         textRect5.center = (285, 150), (285, 200), (285, 250), (285, 300), (285, 350), (285, 400), (285, 500)
 
-        # Wait for Keypress To Move To Next State
-        key_pressed = False
-        while not key_pressed:
-            self.surface.blit(text, textRect)
-            self.surface.blit(text0, textRect0)
-            self.surface.blit(text1, textRect1)
-            self.surface.blit(text2, textRect2)
-            self.surface.blit(text3, textRect3)
-            self.surface.blit(text4, textRect4)
-            self.surface.blit(text5, textRect5)
-            pg.display.update()
+        # the table does not change while it is shown, so it is drawn once
+        self.surface.blit(text, textRect)
+        self.surface.blit(text0, textRect0)
+        self.surface.blit(text1, textRect1)
+        self.surface.blit(text2, textRect2)
+        self.surface.blit(text3, textRect3)
+        self.surface.blit(text4, textRect4)
+        self.surface.blit(text5, textRect5)
+        pg.display.update()
 
-            for e in pg.event.get():
-                if e.type == QUIT or e.type == KEYDOWN and e.key == K_ESCAPE:
-                    Game.terminate()
-                elif e.type == KEYDOWN and e.key == K_BACKSPACE:
-                    key_pressed = True
+    def scores_frame(self, events):
+        # Wait for Keypress To Move To Next State
+        for e in events:
+            if e.type == QUIT or e.type == KEYDOWN and e.key == K_ESCAPE:
+                Game.terminate()
+            elif e.type == KEYDOWN and e.key == K_BACKSPACE:
+                self.change_scene(Game.MENU_SCENE)
 
+    def scores_exit(self):
         self.h = 0  # highscores is off
-        self.menu()
-
-    def play(self):
-        pg.mixer.music.load(self.intro_src)
-        pg.mixer.music.play(1, 0.0)
-        while not self.finished:
-            for event in pg.event.get():
-                self.process_event_loop(event)
 
+    def play_enter(self):
+        self.renderer.invalidate()
+        # can't move until intro music stops
+        self.enter(Game.INTRO, self.intro_src)
+
+    def play_frame(self, events):
+        # A frame spent waiting on INTRO/DYING music only redraws; game keys pressed during it are held for the
+        # first frame after, as the old blocking waits left them queued. Those frames are not recorded either,
+        # so a recording replays frame for frame headless, where the music takes no time.
+        if self.state != Game.PLAYING and self.music_busy():
+            for event in events:
+                if getattr(event, 'key', None) in Game.PLAY_KEYS:
+                    self.held.append(event)
+                else:
+                    self.process_event_loop(event)
+            self.hold()
+        else:
+            if self.held:
+                events, self.held = self.held + list(events), []
+            self.handle_events(events)
             self.update()
-            # can't move until intro music stops
-            while pg.mixer.music.get_busy():
-                time.sleep(0.02)
-            time.sleep(0.02)
-            self.mainClock.tick(self.FPS)
-        Game.terminate()
+        self.finish_frame()
+
+    def game_over_frame(self, events):
+        # the board and score were reset by update(); the menu blinks the game over banner
+        self.change_scene(Game.MENU_SCENE)
 
     @staticmethod
     def terminate():
@@ -1021,7 +1082,21 @@ class Game:
 # -------------------------------------------------------------------------------------
 def main():
     game = Game(title='Pac-Man')
-    game.menu()
+    args = sys.argv[1:]
+    if '--record' in args[:-1]:
+        from replay import Recorder
+        game.recorder = Recorder(args[args.index('--record') + 1])
+    if '--spectate' in args:
+        from spectate import SpectatorServer
+        try:
+            game.spectators = SpectatorServer(game).start()
+        except (OSError, ValueError) as error:  # the port is taken, the server never came up or the maze won't fit
+            print(f'Not serving spectators: {error}', file=sys.stderr)
+    if '--capture' in args[:-1]:
+        from capture import FrameCapture, report, sink
+        game.capture = FrameCapture(game.surface, sink(args[args.index('--capture') + 1]))
+        atexit.register(report, game.capture)
+    game.run()
 
 
 # -------------------------------------------------------------------------------------
@@ -0,0 +1,125 @@
+import json
+import time
+from collections import deque
+
+
+class Profiler:
+    # Rolling per-stage frame timings. Enabling wraps the stage methods on the game's own objects and
+    # disabling removes the wrappers again, so a game that is not being profiled runs the plain methods.
+    WINDOW = 240  # samples kept per stage (about five seconds of play)
+    BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16)  # histogram upper bounds in ms; the last bucket is open
+    REFRESH = 30  # frames between overlay text updates
+    COLOR, BACKGROUND = (0, 255, 0), (0, 0, 0)
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.samples = {}  # stage -> deque of seconds
+        self.wrapped = []  # (object, method name) currently wrapped
+        self.overlay = False
+        self.recording = False  # timing for an export without the overlay (see record())
+        self.lines, self.frames = [], 0
+
+    @property
+    def enabled(self):
+        return bool(self.wrapped)
+
+    def stages(self, game):
+        # (object, method, stage name) for every stage of Game.update worth separating
+        stages = [(game, 'update', 'frame'), (game.grid, 'update', 'grid'), (game.player, 'update', 'player'),
+                  (game.bluePortal, 'update', 'portals'), (game.oranPortal, 'update', 'portals'),
+                  (game, 'draw_hud', 'hud'), (game.renderer, 'flush', 'display')]
+        for name in ('blinky', 'pinky', 'inky', 'clyde'):
+            stages.append((getattr(game, name), 'update', name))
+        return stages
+
+    def enable(self, game):
+        if self.enabled:
+            return
+        self.samples.clear()  # nothing left over from an earlier profiling session
+        clock = time.perf_counter
+        for obj, method, name in self.stages(game):
+            inner = getattr(obj, method)
+            samples = self.samples.setdefault(name, deque(maxlen=self.window))
+
+            def timed(*args, inner=inner, samples=samples, **kwargs):
+                start = clock()
+                try:
+                    return inner(*args, **kwargs)
+                finally:
+                    samples.append(clock() - start)
+
+            setattr(obj, method, timed)
+            self.wrapped.append((obj, method))
+
+    def disable(self):
+        for obj, method in self.wrapped:
+            obj.__dict__.pop(method, None)
+        self.wrapped = []
+        self.overlay = self.recording = False
+
+    def toggle_overlay(self, game):
+        if self.overlay:
+            self.overlay = False
+            if not self.recording:
+                self.disable()
+        else:
+            self.enable(game)
+            self.overlay, self.frames = True, 0
+
+    def record(self, game, path):
+        # F4: with the overlay on, export what it shows. Otherwise the first press starts timing and the next
+        # one exports and stops, so an export never holds stale or missing stats.
+        if not self.enabled:
+            self.enable(game)
+            self.recording = True
+            print(f'Profiling: timing frames, press F4 again to write {path}')
+            return False
+        if not self.export(path):
+            print('Profiling: no frames timed yet')
+            return False
+        print(f'Profiling: wrote {path}')
+        if self.overlay:
+            self.recording = False  # the overlay keeps timing; F3 turns it all off
+        else:
+            self.disable()
+        return True
+
+    def stats(self):
+        report = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            n = len(ordered)
+            counts = [0] * (len(Profiler.BUCKETS) + 1)
+            for s in ordered:
+                ms = 1000 * s
+                i = 0
+                while i < len(Profiler.BUCKETS) and ms > Profiler.BUCKETS[i]:
+                    i += 1
+                counts[i] += 1
+            report[name] = {'n': n, 'mean_ms': 1000 * sum(ordered) / n, 'p50_ms': 1000 * ordered[n // 2],
+                            'p95_ms': 1000 * ordered[min(n - 1, n * 95 // 100)], 'max_ms': 1000 * ordered[-1],
+                            'histogram_ms': dict(zip([f'<={b}' for b in Profiler.BUCKETS] + ['>'], counts))}
+        return report
+
+    def export(self, path):
+        # False (and nothing written) until some frame has been timed
+        if not self.stats():
+            return False
+        with open(path, 'w') as f:
+            json.dump({'window': self.window, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stages': self.stats()},
+                      f, indent=2)
+        return True
+
+    def draw(self, renderer, font):
+        # overlay text is re-rendered every REFRESH frames and just re-blitted in between
+        if self.frames % Profiler.REFRESH == 0:
+            self.lines = [font.render(f"{name}  p50 {s['p50_ms']:.2f}  p95 {s['p95_ms']:.2f} ms", True,
+                                      Profiler.COLOR, Profiler.BACKGROUND)
+                          for name, s in self.stats().items()]
+        self.frames += 1
+        y = 50
+        for line in self.lines:
+            renderer.blit(line, (5, y))
+            y += line.get_height()
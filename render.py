@@ -0,0 +1,71 @@
+import pygame as pg
+
+
+class DirtyRenderer:
+
+    def __init__(self, surface, base):
+        self.surface = surface
+        self.base = base  # static backdrop: black window with the maze on it
+        self.background = base.copy()  # backdrop plus static props (the pellets still on the board)
+        self.drawn, self.dirty = [], []
+        self.full = True
+
+    def invalidate(self):
+        # next frame repaints and pushes the whole window
+        self.full = True
+
+    def reset_background(self, paint):
+        self.background.blit(self.base, (0, 0))
+        paint(self.background)
+        self.full = True
+
+    def erase(self, rect, redraw=None):
+        # permanently remove a static prop (an eaten pellet) from the background; redraw(background, rect)
+        # puts back any neighbouring props the rect also covered
+        self.background.blit(self.base, rect, rect)
+        if redraw is not None:
+            clip = self.background.get_clip()
+            self.background.set_clip(rect)
+            redraw(self.background, rect)
+            self.background.set_clip(clip)
+        self.surface.blit(self.background, rect, rect)
+        self.dirty.append(rect)
+
+    def paint(self, draw, rect):
+        # permanently change a static prop (a widget's look): redraw it on the background and show it
+        draw(self.background)
+        self.surface.blit(self.background, rect, rect)
+        self.dirty.append(rect)
+
+    def begin(self):
+        if self.full:
+            self.surface.blit(self.background, (0, 0))
+            self.drawn, self.dirty = [], []
+        else:
+            # put the background back under everything drawn last frame
+            for rect in self.drawn:
+                self.surface.blit(self.background, rect, rect)
+            self.dirty.extend(self.drawn)
+            self.drawn = []
+
+    def track(self, rect):
+        self.drawn.append(rect)
+        self.dirty.append(rect)
+
+    def blit(self, image, dest):
+        self.track(self.surface.blit(image, dest))
+
+    def stamp(self, image, rect, old=None):
+        # draw something that stays put until it changes (HUD text) instead of redrawing it every frame
+        if old is not None:
+            self.surface.blit(self.background, old, old)
+            self.dirty.append(old)
+        self.dirty.append(self.surface.blit(image, rect))
+
+    def flush(self):
+        if self.full:
+            pg.display.update()
+            self.full = False
+        else:
+            pg.display.update(self.dirty)
+        self.dirty = []
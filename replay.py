@@ -0,0 +1,165 @@
+import argparse
+import atexit
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+import pygame as pg
+
+# Session recordings: the RNG seed, the speed class attributes and every gameplay key event, tagged with the
+# frame it arrived on. Replays feed the same events back through Game.process_event_loop on the headless
+# fixed-step clock, so a long session re-simulates in seconds.
+#
+#   python pacman_game.py --record session.pmr
+#   python replay.py session.pmr [--render]
+
+MAGIC, VERSION = b'PMRP', 1
+HEADER = struct.Struct('<Qiii')  # seed, Player.SPEED, Enemy.SPEED, Portal.SPEED
+KINDS = {pg.KEYDOWN: 0, pg.KEYUP: 1, pg.QUIT: 2}
+TYPES = {kind: event_type for event_type, kind in KINDS.items()}
+END = 0xFF
+
+
+def write_varint(f, n):
+    while n >= 0x80:
+        f.write(bytes((n & 0x7F | 0x80,)))
+        n >>= 7
+    f.write(bytes((n,)))
+
+
+def read_varint(f):
+    n, shift = 0, 0
+    while True:
+        b = f.read(1)
+        if not b:
+            raise EOFError('truncated recording')
+        n |= (b[0] & 0x7F) << shift
+        if b[0] < 0x80:
+            return n
+        shift += 7
+
+
+class Recorder:
+    # Each event is stored as (frames since the previous event, kind, key); quiet frames cost nothing
+
+    def __init__(self, path, seed=None, speeds=None):
+        from pacman_game import Enemy, Player, Portal
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        random.seed(self.seed)
+        self.speeds = speeds or (Player.SPEED, Enemy.SPEED, Portal.SPEED)
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + bytes((VERSION,)) + HEADER.pack(self.seed, *self.speeds))
+        self.frame, self.last = 0, 0
+        atexit.register(self.close)
+
+    def record(self, events):
+        # called once per gameplay frame with that frame's events
+        if self.file is None:
+            return
+        for event in events:
+            kind = KINDS.get(event.type)
+            if kind is None:
+                continue
+            write_varint(self.file, self.frame - self.last)
+            self.file.write(bytes((kind,)))
+            write_varint(self.file, getattr(event, 'key', 0))
+            self.last = self.frame
+        self.frame += 1
+
+    def close(self):
+        if self.file is None:
+            return
+        write_varint(self.file, self.frame - self.last)
+        self.file.write(bytes((END,)))
+        self.file.close()
+        self.file = None
+
+
+class Recording:
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(4) != MAGIC:
+                raise ValueError(f'{path} is not a Pac-Man recording')
+            version = f.read(1)[0]
+            if version != VERSION:
+                raise ValueError(f'unsupported recording version {version}')
+            self.seed, *speeds = HEADER.unpack(f.read(HEADER.size))
+            self.speeds = tuple(speeds)
+            self.events = {}  # frame -> [(event type, key)]
+            frame = 0
+            while True:
+                frame += read_varint(f)
+                kind = f.read(1)[0]
+                if kind == END:
+                    break
+                self.events.setdefault(frame, []).append((TYPES[kind], read_varint(f)))
+            self.length = frame
+
+    def __len__(self):
+        return self.length
+
+    def frames(self):
+        # one list of pygame events per recorded frame
+        empty = []
+        for frame in range(self.length):
+            keyed = self.events.get(frame)
+            yield [pg.event.Event(t, key=k) for t, k in keyed] if keyed else empty
+
+
+def replay(path, render=False, limit=None, capture=None):
+    # capture: a capture.py sink that gets every replayed frame (implies render)
+    from pacman_game import Enemy, Game, Player, Portal
+    recording = Recording(path)
+    Player.SPEED, Enemy.SPEED, Portal.SPEED = recording.speeds
+    random.seed(recording.seed)
+    game = Game(title='Pac-Man replay', headless=True)
+    game.render = render or capture is not None
+    if capture is not None:
+        from capture import FrameCapture
+        # nothing is live here, so every frame is kept: the replay waits whenever the writer is behind
+        game.capture = FrameCapture(game.surface, capture, wait=True)
+    frames = 0
+    for events in recording.frames():
+        if game.finished or (limit is not None and frames >= limit):
+            break
+        game.step(events)
+        frames += 1
+    if game.capture is not None:
+        from capture import report
+        report(game.capture)
+    return game, frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-simulate a recorded Pac-Man session as fast as possible')
+    parser.add_argument('recording')
+    parser.add_argument('--render', action='store_true', help='draw every frame (to the dummy display)')
+    parser.add_argument('--frames', type=int, help='stop after this many frames')
+    parser.add_argument('--capture', help='save every frame: a directory, a video file (ffmpeg) or |command')
+    parser.add_argument('--format', choices=('raw', 'zlib', 'png'), default='raw', help='frame files to write')
+    args = parser.parse_args(argv)
+
+    path = os.path.abspath(args.recording)
+    target = args.capture
+    if target and not target.startswith('|'):
+        target = os.path.abspath(target)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    if target:
+        from capture import sink
+        target = sink(target, args.format)
+    game, frames = replay(path, render=args.render, limit=args.frames, capture=target)
+    elapsed = time.perf_counter() - start
+    json.dump({'frames': frames, 'seconds': elapsed, 'frames_per_sec': frames / elapsed if elapsed else None,
+               'score': game.score, 'last_score': game.lastScore, 'level': game.level,
+               'lives': game.player.lives, 'finished': game.finished}, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import argparse
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+# Full headless games spread over a process pool, one worker per core. Player/Enemy/Portal.SPEED are class
+# attributes that level-ups change as a game goes, so games cannot share a process: every worker owns its own
+# copies and reuses one Game, which Game.reset() sets to each episode's speeds.
+# Results stream back as each episode finishes.
+#
+#   python runner.py --episodes 32 --ghost-speed 5 6 7 --policy random idle --out results.jsonl
+
+# Policies are called once per frame as policy(game, frame, rng) and return that frame's events
+def idle(game, frame, rng):
+    return ()
+
+
+def random_keys(game, frame, rng, every=12):
+    # a random key press every few frames, like benchmark.script()
+    import pygame as pg
+    from pacman_game import KEYS
+    if frame % every:
+        return ()
+    return [pg.event.Event(pg.KEYDOWN, key=rng.choice(KEYS))]
+
+
+POLICIES = {'idle': idle, 'random': random_keys}
+
+
+def policy(name):
+    # a built-in name, or module:function for a bot defined elsewhere
+    if name in POLICIES:
+        return POLICIES[name]
+    module, _, function = name.partition(':')
+    return getattr(importlib.import_module(module), function)
+
+
+def episodes(seeds, policies=('random',), playerSpeeds=(None,), ghostSpeeds=(None,), portalSpeeds=(None,),
+             frames=20000, maze=None):
+    # one settings dict per (seed, policy, speeds) combination; None keeps the class default. Workers chdir to
+    # the game's directory, so a maze path given relative to ours is made absolute here.
+    maze = maze and os.path.abspath(maze)
+    for seed, name, player, ghost, portal in itertools.product(seeds, policies, playerSpeeds, ghostSpeeds,
+                                                               portalSpeeds):
+        yield {'seed': seed, 'policy': name, 'playerSpeed': player, 'ghostSpeed': ghost, 'portalSpeed': portal,
+               'frames': frames, 'maze': maze}
+
+
+_games = {}  # maze -> this worker's Game
+
+
+def setup():
+    # pool initializer: each worker runs headless from the game directory
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    # SDL would turn the pool's SIGTERM into a quit event and the worker would never exit
+    os.environ['SDL_NO_SIGNAL_HANDLERS'] = '1'
+    # the game's own prints would land in the middle of the JSON written by main()
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+    sys.stdout = open(os.devnull, 'w')
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+
+def play(settings):
+    # one full game with settings; runs in a worker
+    from pacman_game import SPEEDS, Game
+    speeds = tuple(default if value is None else value for default, value in
+                   zip(SPEEDS, (settings['playerSpeed'], settings['ghostSpeed'], settings['portalSpeed'])))
+    maze = settings.get('maze') or Game.MAZE
+    game = _games.get(maze)
+    if game is None:
+        game = _games[maze] = Game(title='Pac-Man runner', headless=True, maze=maze)
+    game.reset(speeds)
+    random.seed(settings['seed'])
+    rng = random.Random(settings['seed'])
+    bot = policy(settings['policy'])
+
+    start = time.perf_counter()
+    frame = level = deaths = dying = 0
+    while frame < settings['frames'] and not game.finished:
+        game.step(bot(game, frame, rng))
+        frame += 1
+        level = max(level, game.level)
+        if game.player.death and not dying:
+            deaths += 1
+        dying = game.player.death
+    return dict(settings, score=game.lastScore if game.finished else game.score, level=level, deaths=deaths,
+                framesPlayed=frame, finished=game.finished, seconds=time.perf_counter() - start,
+                pid=os.getpid())
+
+
+def run(settings, workers=None):
+    # yields each episode's result as soon as it is done, in completion order
+    settings = list(settings)
+    workers = min(workers or os.cpu_count() or 1, len(settings)) or 1
+    # spawned workers start clean: no pygame state or speed attributes inherited from this process
+    with multiprocessing.get_context('spawn').Pool(workers, initializer=setup) as pool:
+        yield from pool.imap_unordered(play, settings)
+
+
+def aggregate(results):
+    # summary per (policy, speeds, maze) group
+    groups = {}
+    for result in results:
+        key = (result['policy'], result['playerSpeed'], result['ghostSpeed'], result['portalSpeed'], result['maze'])
+        groups.setdefault(key, []).append(result)
+    summary = []
+    for (name, player, ghost, portal, maze), group in groups.items():
+        n = len(group)
+        scores = sorted(r['score'] for r in group)
+        summary.append({'policy': name, 'playerSpeed': player, 'ghostSpeed': ghost, 'portalSpeed': portal,
+                        'maze': maze, 'episodes': n, 'mean_score': sum(scores) / n, 'min_score': scores[0],
+                        'median_score': scores[n // 2], 'max_score': scores[-1],
+                        'mean_level': sum(r['level'] for r in group) / n,
+                        'mean_deaths': sum(r['deaths'] for r in group) / n,
+                        'mean_frames': sum(r['framesPlayed'] for r in group) / n,
+                        'finished': sum(r['finished'] for r in group)})
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play many headless Pac-Man games in parallel and summarize them')
+    parser.add_argument('--episodes', type=int, default=8, help='games per combination of settings')
+    parser.add_argument('--seed', type=int, default=0, help='first seed; episodes use seed, seed + 1, ...')
+    parser.add_argument('--policy', nargs='+', default=['random'], help='idle, random or module:function')
+    parser.add_argument('--player-speed', type=int, nargs='+', default=[None])
+    parser.add_argument('--ghost-speed', type=int, nargs='+', default=[None])
+    parser.add_argument('--portal-speed', type=int, nargs='+', default=[None])
+    parser.add_argument('--frames', type=int, default=20000, help='stop an unfinished game after this many frames')
+    parser.add_argument('--maze', help='level file (default mazes/classic.json)')
+    parser.add_argument('--workers', type=int, help='processes (default one per core)')
+    parser.add_argument('--out', help='append one JSON line per episode to this file as they finish')
+    args = parser.parse_args(argv)
+
+    settings = episodes(range(args.seed, args.seed + args.episodes), args.policy, args.player_speed,
+                        args.ghost_speed, args.portal_speed, args.frames, args.maze)
+    out = open(args.out, 'a') if args.out else None
+    results, start = [], time.perf_counter()
+    try:
+        for result in run(settings, args.workers):
+            results.append(result)
+            if out:
+                out.write(json.dumps(result) + '\n')
+                out.flush()
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+    json.dump({'episodes': len(results), 'seconds': elapsed,
+               'frames_per_sec': sum(r['framesPlayed'] for r in results) / elapsed if elapsed else None,
+               'groups': aggregate(results)}, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
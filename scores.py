@@ -0,0 +1,47 @@
+import heapq
+import os
+
+
+class HighScores:
+    # The best SIZE scores, kept as a min-heap so a new score only has to beat heap[0]. The file holds at
+    # most SIZE lines and is replaced atomically, so loading stays cheap and a crash mid-save leaves the old
+    # table intact.
+    SIZE = 5
+
+    def __init__(self, path, size=SIZE):
+        self.path = path
+        self.size = size
+        self.heap = []
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        self.add(int(line))
+                    except ValueError:
+                        continue  # blank or damaged line
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self.heap)
+
+    def add(self, score):
+        # True if score made the table
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, score)
+            return True
+        if score > self.heap[0]:
+            heapq.heapreplace(self.heap, score)
+            return True
+        return False
+
+    def top(self):
+        return sorted(self.heap, reverse=True)
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(''.join(f'{score}\n' for score in self.top()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
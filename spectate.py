@@ -0,0 +1,328 @@
+import argparse
+import asyncio
+import json
+import os
+import struct
+import sys
+import threading
+
+# Live spectating over local sockets. The game calls SpectatorServer.publish() once per tick; it encodes what
+# changed since the last tick (actor positions, portal and blue-mode flags, power pellets, score, lives, level,
+# the pellets eaten) into a few dozen bytes and hands them to an asyncio server running on its own thread, which
+# writes them to every spectator. A spectator that stops reading is never waited for: once too much is queued
+# for it, it misses ticks and gets a full keyframe when it catches up.
+#
+#   python pacman_game.py --spectate           # play, serving spectators on localhost:PORT
+#   python spectate.py [host] [--port PORT]     # watch
+#
+# Messages are a little-endian u16 length, a type byte and the body:
+#   HELLO  JSON: maze file, window size
+#   KEY    tick, full state, every pellet as a bitmap
+#   DELTA  tick, a byte saying which parts follow, then just those parts
+
+ROOT = os.path.dirname(os.path.abspath(__file__))  # the maze, art and font paths are relative to the repo
+PORT = 8765
+HELLO, KEY, DELTA = 0, 1, 2
+ACTORS = ('player', 'blinky', 'pinky', 'inky', 'clyde', 'bluePortal', 'oranPortal')
+ACTOR_MOVED, FLAGS, SCORE, STATUS, EATEN = 1, 2, 4, 8, 16  # DELTA parts
+LENGTH = struct.Struct('<H')
+TICK = struct.Struct('<BI')  # type, tick
+POSITION = struct.Struct('<hh')
+FLAG_BITS = struct.Struct('<BH')  # portal active / blue mode bits, power pellets left
+MAX_POWER = 16  # one bit each in FLAG_BITS
+STATUS_BITS = struct.Struct('<BHB')  # lives, level, facing
+SCORE_BITS = struct.Struct('<i')
+MAX_EATEN = 64  # more pellets than this changing in one tick (a new board) is sent as a keyframe
+
+
+def snapshot(game):
+    # the spectated state: (positions, flags, power, score, (lives, level, facing), pellets)
+    flags = game.bluePortal.active | game.oranPortal.active << 1 | (game.bluemode == 1) << 2
+    power = sum(bit << i for i, bit in enumerate(game.grid.power))
+    facing = game.player.ANGLES.index(game.player.currentAngle)
+    return (tuple(tuple(getattr(game, name).rect.topleft) for name in ACTORS), flags, power, game.score,
+            (game.player.lives, game.level, facing), bytes(game.grid.pellets))
+
+
+def encode_key(tick, state):
+    positions, flags, power, score, status, pellets = state
+    bitmap = bytearray((len(pellets) + 7) // 8)
+    for i, pellet in enumerate(pellets):
+        if pellet:
+            bitmap[i >> 3] |= 1 << (i & 7)
+    return b''.join([TICK.pack(KEY, tick), *(POSITION.pack(*p) for p in positions), FLAG_BITS.pack(flags, power),
+                     SCORE_BITS.pack(score), STATUS_BITS.pack(*status), LENGTH.pack(len(pellets)), bytes(bitmap)])
+
+
+def encode_delta(tick, last, state):
+    # None when the pellets changed too much for a diff to be worth it
+    positions, flags, power, score, status, pellets = state
+    parts, body = 0, []
+    moved = [i for i, (a, b) in enumerate(zip(positions, last[0])) if a != b]
+    if moved:
+        parts |= ACTOR_MOVED
+        body.append(bytes((sum(1 << i for i in moved),)))
+        body.extend(POSITION.pack(*positions[i]) for i in moved)
+    if (flags, power) != last[1:3]:
+        parts |= FLAGS
+        body.append(FLAG_BITS.pack(flags, power))
+    if score != last[3]:
+        parts |= SCORE
+        body.append(SCORE_BITS.pack(score))
+    if status != last[4]:
+        parts |= STATUS
+        body.append(STATUS_BITS.pack(*status))
+    if pellets != last[5]:
+        changed = changed_bytes(pellets, last[5])
+        if changed is None or any(pellets[i] for i in changed):
+            return None
+        parts |= EATEN
+        body.append(struct.pack(f'<B{len(changed)}H', len(changed), *changed))
+    return b''.join([TICK.pack(DELTA, tick), bytes((parts,)), *body])
+
+
+def changed_bytes(a, b, limit=MAX_EATEN):
+    # indices where two equal-length 0/1 byte strings differ, or None past limit. XORed as one big integer, each
+    # changed byte is a single set bit, so the cost is per change rather than per pellet.
+    bits = int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')
+    changed = []
+    while bits:
+        if len(changed) == limit:
+            return None
+        low = bits & -bits
+        changed.append(low.bit_length() - 1 >> 3)
+        bits ^= low
+    return changed
+
+
+def frame(message):
+    return LENGTH.pack(len(message)) + message
+
+
+class SpectatorServer:
+    LIMIT = 16 * 1024  # bytes queued for one spectator before it starts missing ticks
+
+    def __init__(self, game, host='127.0.0.1', port=PORT):
+        if len(game.grid.power) > MAX_POWER:
+            raise ValueError(f'{game.maze.name} has {len(game.grid.power)} power pellets; spectators can be '
+                             f'sent at most {MAX_POWER}')
+        self.game = game
+        self.host, self.port = host, port
+        self.hello = frame(bytes((HELLO,)) + json.dumps(
+            {'maze': game.maze.path, 'size': [game.WINDOW_WIDTH, game.WINDOW_HEIGHT]}).encode())
+        self.clients = {}  # writer -> True while it needs a keyframe before any delta
+        self.wantKey = False  # set from the server thread, read by publish()
+        self.tick, self.last = 0, None
+        self.sent = 0  # bytes handed to spectators, for bandwidth checks
+        self.loop = None
+        self.ready = threading.Event()
+        self.error = None  # why the server could not start, raised again by start()
+
+    def start(self, timeout=5):
+        threading.Thread(target=asyncio.run, args=(self.serve(),), name='spectators', daemon=True).start()
+        if not self.ready.wait(timeout):
+            raise TimeoutError(f'spectator server on {self.host}:{self.port} did not start within {timeout} s')
+        if self.error is not None:
+            raise self.error
+        return self
+
+    async def serve(self):
+        try:
+            server = await asyncio.start_server(self.connect, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]  # the real one when port was 0
+            self.loop = asyncio.get_running_loop()
+        except Exception as error:  # e.g. the port is taken; start() raises it on the game's thread
+            self.error = error
+            return
+        finally:
+            self.ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def connect(self, reader, writer):
+        writer.write(self.hello)
+        self.clients[writer] = True
+        self.wantKey = True
+        try:
+            await reader.read()  # spectators never send anything; this returns when they leave
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    def publish(self):
+        # game thread, once per tick: encode and hand over, never wait on the network
+        if self.loop is None or not self.clients:
+            self.last = None
+            return
+        self.tick += 1
+        state = snapshot(self.game)
+        delta = encode_delta(self.tick, self.last, state) if self.last is not None else None
+        key = encode_key(self.tick, state) if delta is None or self.wantKey else None
+        self.wantKey = False
+        self.last = state
+        self.loop.call_soon_threadsafe(self.broadcast, delta and frame(delta), key and frame(key))
+
+    def broadcast(self, delta, key):
+        # server thread
+        for writer, needsKey in list(self.clients.items()):
+            if writer.transport.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() > SpectatorServer.LIMIT:
+                # too far behind: skip ticks until the queue drains, then resync with a keyframe
+                self.clients[writer] = True
+                self.wantKey = True
+                continue
+            if needsKey or delta is None:
+                if key is None:
+                    self.wantKey = True
+                    continue
+                writer.write(key)
+                self.sent += len(key)
+                self.clients[writer] = False
+            else:
+                writer.write(delta)
+                self.sent += len(delta)
+
+
+class Watcher:
+    # a spectator's copy of the game, rebuilt from the server's messages
+
+    def __init__(self):
+        self.info = None
+        self.tick = None
+        self.positions, self.flags, self.power, self.score, self.status = [(0, 0)] * len(ACTORS), 0, 0, 0, (0, 0, 0)
+        self.pellets = bytearray()
+        self.received = 0
+
+    def state(self):
+        # same shape as snapshot(game)
+        return (tuple(self.positions), self.flags, self.power, self.score, self.status, bytes(self.pellets))
+
+    def apply(self, message):
+        self.received += len(message) + LENGTH.size
+        kind = message[0]
+        if kind == HELLO:
+            self.info = json.loads(message[1:])
+            return
+        _, self.tick = TICK.unpack_from(message)
+        offset = TICK.size
+        if kind == KEY:
+            self.positions = [POSITION.unpack_from(message, offset + POSITION.size * i) for i in range(len(ACTORS))]
+            offset += POSITION.size * len(ACTORS)
+            self.flags, self.power = FLAG_BITS.unpack_from(message, offset)
+            offset += FLAG_BITS.size
+            self.score, = SCORE_BITS.unpack_from(message, offset)
+            offset += SCORE_BITS.size
+            self.status = STATUS_BITS.unpack_from(message, offset)
+            offset += STATUS_BITS.size
+            count, = LENGTH.unpack_from(message, offset)
+            bitmap = message[offset + LENGTH.size:]
+            self.pellets = bytearray(bitmap[i >> 3] >> (i & 7) & 1 for i in range(count))
+            return
+        parts = message[offset]
+        offset += 1
+        if parts & ACTOR_MOVED:
+            moved = message[offset]
+            offset += 1
+            for i in range(len(ACTORS)):
+                if moved >> i & 1:
+                    self.positions[i] = POSITION.unpack_from(message, offset)
+                    offset += POSITION.size
+        if parts & FLAGS:
+            self.flags, self.power = FLAG_BITS.unpack_from(message, offset)
+            offset += FLAG_BITS.size
+        if parts & SCORE:
+            self.score, = SCORE_BITS.unpack_from(message, offset)
+            offset += SCORE_BITS.size
+        if parts & STATUS:
+            self.status = STATUS_BITS.unpack_from(message, offset)
+            offset += STATUS_BITS.size
+        if parts & EATEN:
+            count = message[offset]
+            for i in struct.unpack_from(f'<{count}H', message, offset + 1):
+                self.pellets[i] = 0
+
+    async def watch(self, host='127.0.0.1', port=PORT, on_message=None):
+        # apply messages until the server goes away; on_message(self) after each one
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while True:
+                length, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                self.apply(await reader.readexactly(length))
+                if on_message is not None:
+                    on_message(self)
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+
+class View:
+    # draws a Watcher with the maze art and plain shapes; no sprites needed
+    COLORS = ((255, 255, 0), (255, 0, 0), (255, 184, 255), (0, 255, 255), (255, 184, 82), (0, 120, 255),
+              (255, 140, 0))
+    FRIGHTENED = (33, 33, 255)
+
+    def __init__(self, info):
+        import pygame as pg
+        from maze import Maze
+        self.pg = pg
+        pg.init()
+        self.surface = pg.display.set_mode(info['size'])
+        pg.display.set_caption('Pac-Man spectator')
+        self.background = pg.image.load(os.path.join(ROOT, 'images', 'pacGrid.png')).convert()
+        maze = Maze(os.path.join(ROOT, info['maze']), cache=os.path.join(ROOT, Maze.CACHE))
+        self.lattice, self.power = maze.lattice, maze.power
+        self.font = pg.font.Font(os.path.join(ROOT, 'fonts', '8-Bit Madness.ttf'), 28)
+
+    def draw(self, watcher):
+        pg, surface = self.pg, self.surface
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                raise SystemExit
+        surface.fill((0, 0, 0))
+        surface.blit(self.background, (0, 46))
+        size = self.lattice.size
+        for i, pellet in enumerate(watcher.pellets):
+            if pellet:
+                surface.fill((255, 255, 255), (self.lattice.position(i), (size // 2, size // 2)))
+        for i, (x, y) in enumerate(self.power):
+            if watcher.power >> i & 1:
+                # the game draws its 20-pixel power pellet image from this corner
+                pg.draw.circle(surface, (255, 255, 255), (x + 10, y + 10), 8)
+        for i, (x, y) in enumerate(watcher.positions):
+            color = View.COLORS[i]
+            if 1 <= i <= 4 and watcher.flags & 4:
+                color = View.FRIGHTENED
+            if i >= 5:
+                pg.draw.circle(surface, color, (x + 12, y + 12), 12, 3 if watcher.flags >> (i - 5) & 1 else 1)
+            else:
+                pg.draw.circle(surface, color, (x + 12, y + 12), 12)
+        lives, level, _ = watcher.status
+        surface.blit(self.font.render(f'Score: {watcher.score}   Level: {level}   Lives: {lives}', True,
+                                      (255, 255, 255)), (20, 10))
+        pg.display.flip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Watch a Pac-Man game served with --spectate')
+    parser.add_argument('host', nargs='?', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args(argv)
+
+    watcher, views = Watcher(), []
+
+    def show(w):
+        if w.info is not None and not views:
+            views.append(View(w.info))
+        if views and w.tick is not None:
+            views[0].draw(w)
+
+    asyncio.run(watcher.watch(args.host, args.port, show))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
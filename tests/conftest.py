@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# the game loads its images, fonts and mazes relative to the repo root and needs no real display or audio
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+@pytest.fixture
+def game():
+    import benchmark
+    return benchmark.new_game(0, True)
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from assets import HEADER, Assets
+
+
+def damaged(tmp_path, data):
+    path = tmp_path / 'assets.bundle'
+    path.write_bytes(data)
+    bundle = Assets()
+    bundle.path = str(path)
+    return bundle
+
+
+@pytest.mark.parametrize('data', [b'', b'PMAB', HEADER.pack(Assets.MAGIC, Assets.VERSION, 50) + b'{"atlas"'])
+def test_damaged_bundle_falls_back_to_loose_files(tmp_path, capsys, data):
+    bundle = damaged(tmp_path, data)
+    assert not bundle.open()
+    assert bundle.index is None
+    assert 'damaged' in capsys.readouterr().err
+
+
+@pytest.mark.skipif(not os.path.exists(Assets.BUNDLE), reason='no assets.bundle built (python assets.py)')
+def test_truncated_bundle_falls_back_to_loose_files(tmp_path, capsys):
+    with open(Assets.BUNDLE, 'rb') as f:
+        data = f.read()
+    bundle = damaged(tmp_path, data[:len(data) // 2])
+    assert not bundle.open()
+    assert bundle.index is None
+    assert 'damaged' in capsys.readouterr().err
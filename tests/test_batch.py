@@ -0,0 +1,38 @@
+import json
+
+import numpy as np
+import pygame as pg
+import pytest
+
+from batch import BatchSim, parity
+from pacman_game import Game
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_batchsim_matches_game(game, seed):
+    assert parity(game, seed)[0] is None
+
+
+# the classic lattice, and a finer one where Pac-Man overlaps more than three rows and columns of pellets
+@pytest.mark.parametrize('pellets', [{}, {'rows': 68, 'cols': 60, 'pitch': 8}])
+def test_grid_update_eats_what_grid_eats(tmp_path, pellets):
+    with open(Game.MAZE) as f:
+        data = json.load(f)
+    data['pellets'].update(pellets)
+    maze = tmp_path / 'maze.json'
+    maze.write_text(json.dumps(data))
+    game = Game('Pac-Man test', headless=True, maze=str(maze))
+
+    # every spot Pac-Man can stand on, against a full board in both
+    sim = BatchSim(game, 1)
+    grid = game.grid
+    rng = np.random.default_rng(0)
+    for x, y in rng.integers((-30, 60), (560, 640), size=(200, 2)):
+        grid.reset_grid()
+        sim.pellets[0], sim.power[0], sim.remaining[0] = sim.layout, True, grid.remaining
+        sim.player[0] = x, y
+        eaten = grid.eat(pg.Rect(x, y, BatchSim.SIZE, BatchSim.SIZE))
+        before = sim.remaining[0]
+        sim.grid_update(np.array([True]))
+        assert before - sim.remaining[0] == eaten
+        assert bytes(sim.pellets[0].astype(np.uint8)) == bytes(grid.pellets)
@@ -0,0 +1,12 @@
+from pacman_game import SPEEDS, Enemy, Player, Portal
+
+
+def test_reset_restores_speeds(game):
+    Enemy.SPEED += 3
+    game.reset()
+    assert (Player.SPEED, Enemy.SPEED, Portal.SPEED) == SPEEDS
+
+    game.reset((4, 9, 20))
+    assert (Player.SPEED, Enemy.SPEED, Portal.SPEED) == (4, 9, 20)
+    game.reset()
+    assert (Player.SPEED, Enemy.SPEED, Portal.SPEED) == SPEEDS
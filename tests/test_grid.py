@@ -0,0 +1,34 @@
+import pygame as pg
+
+
+def fill(game):
+    # a full board with the renderer's background painted from it, as the first frame of a level does
+    grid = game.grid
+    grid.reset_grid()
+    game.renderer.reset_background(grid.draw)
+    grid.repaint = False
+    return grid
+
+
+def test_eating_power_pellet_keeps_overlapped_pellet(game):
+    grid = fill(game)
+    i = grid.positions.index((40, 110))  # under the top-left power pellet at (35, 105)
+    centre = (45, 115)
+    colour = grid.image.get_at((grid.size // 2, grid.size // 2))
+
+    assert grid.eat_power(pg.Rect(25, 82, 25, 25))
+    assert grid.pellets[i]
+    assert game.renderer.background.get_at(centre) == colour
+    assert game.surface.get_at(centre) == colour
+
+
+def test_eating_pellet_keeps_overlapping_power_pellet(game):
+    grid = fill(game)
+    i = grid.positions.index((40, 110))
+    centre = (45, 115)
+    colour = grid.powerImage.get_at((10, 10))
+    assert game.renderer.background.get_at(centre) == colour
+
+    assert grid.eat(pg.Rect(40, 110, 10, 10))
+    assert not grid.pellets[i] and grid.power[0]
+    assert game.renderer.background.get_at(centre) == colour
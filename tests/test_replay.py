@@ -0,0 +1,34 @@
+import io
+
+import pygame as pg
+import pytest
+
+from replay import Recorder, Recording, read_varint, write_varint
+
+
+@pytest.mark.parametrize('n', [0, 1, 127, 128, 300, 16383, 16384, 1 << 32, (1 << 63) + 5])
+def test_varint_round_trip(n):
+    f = io.BytesIO()
+    write_varint(f, n)
+    assert len(f.getvalue()) == max(1, (n.bit_length() + 6) // 7)
+    f.seek(0)
+    assert read_varint(f) == n
+    assert f.read() == b''
+
+
+def test_truncated_varint_raises():
+    with pytest.raises(EOFError):
+        read_varint(io.BytesIO(b'\x80\x80'))
+
+
+def test_recording_round_trip(tmp_path):
+    path = str(tmp_path / 'session.pmr')
+    recorder = Recorder(path, seed=42, speeds=(6, 7, 30))
+    events = {0: [(pg.KEYDOWN, pg.K_LEFT)], 3: [(pg.KEYDOWN, pg.K_c), (pg.KEYUP, pg.K_LEFT)], 200: [(pg.QUIT, 0)]}
+    for frame in range(250):
+        recorder.record([pg.event.Event(kind, key=key) for kind, key in events.get(frame, ())])
+    recorder.close()
+
+    recording = Recording(path)
+    assert (recording.seed, recording.speeds, len(recording)) == (42, (6, 7, 30), 250)
+    assert recording.events == events
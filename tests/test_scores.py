@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from scores import HighScores
+
+
+def test_keeps_best_scores_in_order(tmp_path):
+    scores = HighScores(str(tmp_path / 'highscores.txt'), size=3)
+    made = [scores.add(score) for score in (50, 10, 30, 20, 40, 10)]
+    assert made == [True, True, True, True, True, False]
+    assert scores.top() == [50, 40, 30]
+    assert len(scores) == 3
+
+
+def test_save_replaces_file_and_loads_back(tmp_path):
+    path = tmp_path / 'highscores.txt'
+    path.write_text('7\nnot a score\n\n3\n')
+    scores = HighScores(str(path))
+    assert scores.top() == [7, 3]
+    scores.add(12)
+    scores.save()
+    assert path.read_text() == '12\n7\n3\n'
+    assert os.listdir(tmp_path) == ['highscores.txt']  # no temporary file left behind
+    assert HighScores(str(path)).top() == [12, 7, 3]
+
+
+def test_failed_save_keeps_old_table(tmp_path, monkeypatch):
+    path = tmp_path / 'highscores.txt'
+    path.write_text('9\n')
+    scores = HighScores(str(path))
+    scores.add(11)
+
+    def crash(fd):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(os, 'fsync', crash)
+    with pytest.raises(OSError):
+        scores.save()
+    assert path.read_text() == '9\n'
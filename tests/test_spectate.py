@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+import benchmark
+from pacman_game import Game
+from spectate import MAX_POWER, SpectatorServer, Watcher, encode_delta, encode_key, snapshot
+
+
+def test_watcher_follows_encoded_game(game):
+    # what a spectator rebuilds from the messages is the game's state after every tick
+    watcher, last = Watcher(), None
+    for tick, events in enumerate(benchmark.script(3, 1500), 1):
+        if game.finished:
+            break
+        game.step(events)
+        state = snapshot(game)
+        message = encode_delta(tick, last, state) if last is not None else None
+        watcher.apply(message if message is not None else encode_key(tick, state))
+        last = state
+        assert watcher.tick == tick
+        assert watcher.state() == state
+
+
+def test_power_mask_fits_max_power():
+    state = (((0, 0),) * 7, 5, (1 << MAX_POWER) - 1, 1230, (3, 2, 1), bytes((1, 0, 1)))
+    watcher = Watcher()
+    watcher.apply(encode_key(1, state))
+    assert watcher.state() == state
+    moved = (state[0], 1, 1 << (MAX_POWER - 1)) + state[3:]
+    watcher.apply(encode_delta(2, state, moved))
+    assert watcher.state() == moved
+
+
+def test_server_rejects_too_many_power_pellets(tmp_path):
+    with open(Game.MAZE) as f:
+        data = json.load(f)
+    data['power'] = [[35 + 15 * i, 105] for i in range(MAX_POWER + 1)]
+    maze = tmp_path / 'maze.json'
+    maze.write_text(json.dumps(data))
+    with pytest.raises(ValueError):
+        SpectatorServer(Game('Pac-Man test', headless=True, maze=str(maze)), port=0)
@@ -0,0 +1,47 @@
+import random
+
+import pygame as pg
+import pytest
+
+from maze import Maze
+from pacman_game import Game
+from walls import WallIndex
+
+
+@pytest.fixture(scope='module')
+def walls():
+    return Maze(Game.MAZE, cache=None).walls
+
+
+def linear_cast(walls, rect, dx, dy, reach):
+    # step one pixel at a time until the next step would overlap a wall
+    if rect.collidelist(walls) != -1:
+        return 0, True
+    for distance in range(reach):
+        if rect.move(dx * (distance + 1), dy * (distance + 1)).collidelist(walls) != -1:
+            return distance, True
+    return reach, False
+
+
+def test_collide_matches_linear_scan(walls):
+    index = WallIndex(walls)
+    rng = random.Random(0)
+    for _ in range(2000):
+        rect = pg.Rect(rng.randrange(-40, 580), rng.randrange(0, 720), rng.randrange(1, 40), rng.randrange(1, 40))
+        assert index.collide(rect) == (rect.collidelist(walls) != -1)
+
+
+def test_cast_matches_linear_scan(walls):
+    index = WallIndex(walls)
+    rng = random.Random(1)
+    for _ in range(2000):
+        rect = pg.Rect(rng.randrange(-40, 580), rng.randrange(0, 720), 25, 25)
+        dx, dy = rng.choice(((1, 0), (-1, 0), (0, 1), (0, -1)))
+        reach = rng.randrange(1, 200)
+        assert index.cast(rect, dx, dy, reach) == linear_cast(walls, rect, dx, dy, reach)
+
+
+def test_maze_cache_key_covers_compiler_code(monkeypatch):
+    key = Maze(Game.MAZE, cache=None).key
+    monkeypatch.setattr(Maze, 'CODE', Maze.CODE + b'edited')
+    assert Maze(Game.MAZE, cache=None).key != key
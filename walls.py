@@ -0,0 +1,68 @@
+import pygame as pg
+
+
+class WallIndex:
+    CELL = 50
+
+    def __init__(self, walls, cell=CELL):
+        # walls may be Rects or anything with a .rect (the maze builds them as Wall objects)
+        self.cell = cell
+        self.rects = [pg.Rect(getattr(wall, 'rect', wall)) for wall in walls]
+        self.cells = {}
+        for i, rect in enumerate(self.rects):
+            for key in self.cells_for(rect):
+                self.cells.setdefault(key, []).append(i)
+
+    def __len__(self):
+        return len(self.rects)
+
+    def cells_for(self, rect):
+        cell = self.cell
+        for cy in range(rect.top // cell, (rect.bottom - 1) // cell + 1):
+            for cx in range(rect.left // cell, (rect.right - 1) // cell + 1):
+                yield cx, cy
+
+    def collide(self, rect):
+        # same answer as any(rect.colliderect(wall) for wall in walls), but only looks at nearby walls
+        rects, cells = self.rects, self.cells
+        for key in self.cells_for(rect):
+            for i in cells.get(key, ()):
+                if rect.colliderect(rects[i]):
+                    return True
+        return False
+
+    def cast(self, rect, dx, dy, reach):
+        # slide rect along the unit step (dx, dy) for up to reach pixels: how far it gets before it would
+        # overlap a wall, and whether a wall stopped it. One lookup over the swept area, so thin walls
+        # cannot be stepped over.
+        if self.collide(rect):
+            return 0, True
+        swept = rect.union(rect.move(dx * reach, dy * reach))
+        rects, cells = self.rects, self.cells
+        best, hit, seen = reach, False, set()
+        for key in self.cells_for(swept):
+            for i in cells.get(key, ()):
+                if i in seen:
+                    continue
+                seen.add(i)
+                wall = rects[i]
+                if not swept.colliderect(wall):
+                    continue
+                if dx > 0:
+                    gap = wall.left - rect.right
+                elif dx < 0:
+                    gap = rect.left - wall.right
+                elif dy > 0:
+                    gap = wall.top - rect.bottom
+                else:
+                    gap = rect.top - wall.bottom
+                if gap < best:
+                    best, hit = gap, True
+        return best, hit
+
+
+class Wall:
+    # a static maze block; only its rect matters
+
+    def __init__(self, rect):
+        self.rect = rect